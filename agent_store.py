@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import re
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from atomic_files import atomic_write_json
+from change_detection import LiveValue
+from change_log import record_changes
+from firebase_app import reference, sanitize_id
+from firebase_loader import fetch_tree, firebase_key_order, index_updates
+from snapshots import fetch_keys, snapshot_paths
+from tracing import traced
+
+AGENT_FIELDS = ("Title", "AgentDescription", "UsedBy", "RelatedAPIs")
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+logger = logging.getLogger(__name__)
+
+def _string_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None]
+    return None
+
+def _normalize_agent(agent):
+    if not isinstance(agent, dict) or not isinstance(agent.get("Title"), str):
+        return None
+    description = agent.get("AgentDescription", "")
+    used_by = _string_list(agent.get("UsedBy"))
+    related_apis = _string_list(agent.get("RelatedAPIs"))
+    if not isinstance(description, str) or used_by is None or related_apis is None:
+        return None
+    return {"Title": agent["Title"], "AgentDescription": description, "UsedBy": used_by, "RelatedAPIs": related_apis}
+
+# Parse what is stored under Agents/<id> (the raw LLM text, or an already decoded
+# object) into a list of agents with the Title/AgentDescription/UsedBy/RelatedAPIs
+# shape. Returns None when nothing usable can be recovered.
+def parse_agents(raw):
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(_FENCE.sub("", raw.strip()))
+        except json.JSONDecodeError:
+            return None
+    if isinstance(raw, dict):
+        raw = raw.get("agents")
+    if not isinstance(raw, list):
+        return None
+    agents = [agent for agent in map(_normalize_agent, raw) if agent is not None]
+    return agents or None
+
+# Canonical form written to Firebase; still a JSON string with an "agents" list,
+# so it reads the same as entries written before agents were normalized
+def serialize_agents(agents):
+    return json.dumps({"agents": agents})
+
+# Parsed agents of every company, keyed by sanitized company ID. Entries are parsed
+# once when the tree is loaded or an entry is written, never on render.
+class AgentTable:
+    def __init__(self, tree=None):
+        self._agents = {}
+        self._lock = threading.Lock()
+        for key, raw in (tree or {}).items():
+            agents = parse_agents(raw)
+            if agents:
+                self._agents[key] = agents
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __contains__(self, company_key):
+        return company_key in self._agents
+
+    def company_keys(self):
+        return list(self._agents)
+
+    def agents(self, company_key):
+        return self._agents.get(company_key)
+
+    def set(self, company_key, agents):
+        with self._lock:
+            self._agents[company_key] = agents
+
+    def remove(self, company_key):
+        with self._lock:
+            self._agents.pop(company_key, None)
+
+    # Entries in the form stored under Agents/, so AgentTable(table.tree()) is a copy
+    def tree(self):
+        return {key: serialize_agents(agents) for key, agents in list(self._agents.items())}
+
+    # One row per agent, for analysis and export
+    def frame(self):
+        rows = [
+            {"company_key": key, **agent}
+            for key, agents in list(self._agents.items())
+            for agent in agents
+        ]
+        return pd.DataFrame(rows, columns=["company_key", *AGENT_FIELDS])
+
+# The table is also kept on disk next to the snapshots, as the last-known-good
+# copy served on a cold start while the current one loads
+def _save_agents(table):
+    path = snapshot_paths('Agents')[0]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_json(path, table.tree())
+    except OSError as e:
+        logger.warning("Could not save the local copy of Agents: %s", e)
+
+def _load_stale_agents():
+    path = snapshot_paths('Agents')[0]
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return AgentTable(json.load(f))
+
+@traced("fetch.agents_data")
+def _load_agents():
+    table = AgentTable(fetch_tree('Agents'))
+    _save_agents(table)
+    return table
+
+# Written and removed entries are applied to the table in place
+@traced("fetch.agents_data.delta")
+def _apply_agents_delta(table, delta):
+    if delta.full:
+        return _load_agents()
+    records = dict(delta.records)
+    missing = delta.written - records.keys()
+    if missing:
+        records.update(fetch_keys('Agents', sorted(table.company_keys(), key=firebase_key_order), missing))
+    for key in missing - records.keys():
+        table.remove(key)
+    for key, raw in records.items():
+        agents = parse_agents(raw)
+        if agents:
+            table.set(key, agents)
+        else:
+            table.remove(key)
+    for key in delta.removed:
+        table.remove(key)
+    _save_agents(table)
+    return table
+
+agent_data = LiveValue('Agents', _load_agents, _apply_agents_delta, load_stale=_load_stale_agents)
+
+def fetch_agents_data():
+    return agent_data.get()
+
+def fetch_agents_from_firebase(company_id):
+    sanitized_id = sanitize_id(company_id)
+    agents = fetch_agents_data().agents(sanitized_id)
+    if agents:
+        return agents
+    try:
+        return fetch_stored_agents(company_id)
+    except Exception as e:
+        st.error(f"Error fetching agents from Firebase: {e}")
+        return None
+
+# Read Agents/<id> from Firebase itself, bypassing the in-memory table
+def fetch_stored_agents(company_id):
+    sanitized_id = sanitize_id(company_id)
+    ref = reference(f'Agents/{sanitized_id}')
+    agents = parse_agents(ref.get())
+    if agents:
+        fetch_agents_data().set(sanitized_id, agents)
+    return agents
+
+# Write already parsed agents of several companies, and their entries in the key
+# index, with a single multi-path update
+def store_agents_bulk(agents_by_company):
+    updates = {sanitize_id(company_id): agents for company_id, agents in agents_by_company.items()}
+    if not updates:
+        return
+    records = {f'Agents/{key}': serialize_agents(agents) for key, agents in updates.items()}
+    reference('/').update({**records, **index_updates('Agents', updates)})
+    record_changes('Agents', updates)
+    table = fetch_agents_data()
+    for key, agents in updates.items():
+        table.set(key, agents)
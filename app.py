@@ -1,258 +1,108 @@
 import streamlit as st
-from navigate_agents import navigate_agents
-from st_aggrid import AgGrid, GridUpdateMode
-from st_aggrid.grid_options_builder import GridOptionsBuilder
+from data_store import data_versions, fetch_zapier_data, load_company_dataset
+from agent_store import fetch_agents_from_firebase
+from pagination import PAGE_SIZES, page_window
+from cards import agent_card, api_card, render_card_columns, render_paged_cards
+from realtime import REALTIME, start_listeners
+from tracing import finish_trace, metrics, span, start_trace, traced
+import os
 import pandas as pd
 import json
-import os
 from dotenv import load_dotenv
-import streamlit.components.v1 as components
-import requests
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Function to get Firebase credentials
-def get_firebase_credentials():
-    if os.getenv("FIREBASE_TYPE"):
-        return {
-            "type": os.getenv("FIREBASE_TYPE"),
-            "project_id": os.getenv("FIREBASE_PROJECT_ID"),
-            "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
-            "private_key": os.getenv("FIREBASE_PRIVATE_KEY").replace('\\n', '\n'),
-            "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
-            "client_id": os.getenv("FIREBASE_CLIENT_ID"),
-            "auth_uri": os.getenv("FIREBASE_AUTH_URI"),
-            "token_uri": os.getenv("FIREBASE_TOKEN_URI"),
-            "auth_provider_x509_cert_url": os.getenv("FIREBASE_AUTH_PROVIDER_X509_CERT_URL"),
-            "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_X509_CERT_URL")
-        }
-    else:
-        return {
-            "type": st.secrets["firebase"]["type"],
-            "project_id": st.secrets["firebase"]["project_id"],
-            "private_key_id": st.secrets["firebase"]["private_key_id"],
-            "private_key": st.secrets["firebase"]["private_key"],
-            "client_email": st.secrets["firebase"]["client_email"],
-            "client_id": st.secrets["firebase"]["client_id"],
-            "auth_uri": st.secrets["firebase"]["auth_uri"],
-            "token_uri": st.secrets["firebase"]["token_uri"],
-            "auth_provider_x509_cert_url": st.secrets["firebase"]["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": st.secrets["firebase"]["client_x509_cert_url"]
-        }
-
-# Function to get Firebase database URL
-def get_firebase_database_url():
-    return os.getenv("FIREBASE_DATABASE_URL") or st.secrets["firebase"]["database"]["url"]
-
-# Initialize Firebase if not already initialized
-import firebase_admin
-from firebase_admin import credentials, db
-
-if not firebase_admin._apps:
-    cred = credentials.Certificate(get_firebase_credentials())
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': get_firebase_database_url()
-    })
-
-@st.cache_data
-def fetch_company_data():
-    ref = db.reference('FinalMergedData')
-    data = ref.get()
-    parsed_data = [json.loads(value) for value in data.values()]
-    return pd.DataFrame(parsed_data)
-
-@st.cache_data
-def fetch_zapier_data():
-    ref = db.reference('Zapier_Data')
-    data = ref.get()
-    parsed_data = [json.loads(value) for value in data.values()]
-    return pd.DataFrame(parsed_data)
-
-def sanitize_id(company_id):
-    # Replace periods with commas or any other character that Firebase allows
-    return company_id.replace('.', ',')
-
-def fetch_agents_from_firebase(company_id):
-    try:
-        sanitized_id = sanitize_id(company_id)
-        ref = db.reference(f'Agents/{sanitized_id}')
-        agents_data = ref.get()
-        if agents_data:
-            return agents_data
-        else:
-            return None
-    except Exception as e:
-        st.error(f"Error fetching agents from Firebase: {e}")
-        return None
+# Firebase is initialized on the first database read (see firebase_app.reference),
+# and page-specific modules (including jobs, whose HTTP client loads requests) are
+# imported when their page is first drawn, so the script starts without paying for
+# clients and widgets it may not use.
 
-def store_agents_in_firebase(company_id, agents_data):
-    try:
-        sanitized_id = sanitize_id(company_id)
-        ref = db.reference(f'Agents/{sanitized_id}')
-        ref.set(agents_data)
-    except Exception as e:
-        st.error(f"Error storing agents in Firebase: {e}")
-
-def display_api_data(company_id, df_zapier):
-    api_data = df_zapier[df_zapier['ID'] == company_id]
+# Show the timing panel in the sidebar (also enabled by the ?debug=1 query parameter)
+DEBUG_PANEL = os.getenv("FAM_DEBUG_PANEL") == "1"
+
+@traced("home.api_cards")
+def display_api_data(company_id, zapier):
+    apis = zapier.apis(company_id)
     
-    if not api_data.empty:
+    if apis:
         st.subheader(f"{company_id} - Service Details:")
         
         # Display the service description from the first row
-        service_description = api_data.iloc[0]['Descroption']  # Note the typo in the original column name
+        service_description = zapier.description(company_id)
         st.markdown(f"**Service Description:** {service_description}")
         st.markdown("---")
         
-        col1, col2 = st.columns(2)
-        for i, row in api_data.iterrows():
-            api_type = row['API Type']
-            api_name = row['API Name']
-            
-            # Define Google's yellow and green colors
-            google_yellow = "#FBBC05"
-            google_green = "#34A853"
-            
-            # Choose color based on API type
-            color = google_yellow if api_type == 'Trigger' else google_green
-            
-            # Create a card with custom CSS using Google's yellow and green
-            card_html = f"""
-            <div style="
-                border: 1px solid #ddd;
-                border-radius: 8px;
-                padding: 16px;
-                margin: 10px 0;
-                background-color: white;
-                box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15);
-                position: relative;
-                overflow: hidden;
-            ">
-                <div style="
-                    position: absolute;
-                    top: 0;
-                    left: 0;
-                    width: 5px;
-                    height: 100%;
-                    background-color: {color};
-                "></div>
-                <h5 style="margin-left: 10px; color: #202124; font-family: 'Google Sans',Roboto,Arial,sans-serif;">{api_name}</h5>
-                <span style="
-                    margin-left: 10px;
-                    padding: 2px 8px;
-                    background-color: {color};
-                    color: #fff;
-                    border-radius: 12px;
-                    font-family: Roboto,Arial,sans-serif;
-                    font-size: 0.8em;
-                    font-weight: bold;
-                ">{api_type}</span>
-            </div>
-            """
-            
-            # Alternate between columns
-            if i % 2 == 0:
-                col1.markdown(card_html, unsafe_allow_html=True)
-            else:
-                col2.markdown(card_html, unsafe_allow_html=True)
+        render_paged_cards(f"api_cards_{company_id}", len(apis), lambda i: api_card(*apis[i]))
     else:
         st.info("No API data available for this company.")
 
-def get_ai_agent_description(company_data, df_zapier):
-    api_url = "https://api.anthropic.com/v1/messages"
-    headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": os.getenv("ANTHROPIC_API_KEY") or st.secrets["anthropic"]["api_key"],
-        "anthropic-version": "2023-06-01" 
-    }
-    
-    prompt = f"""
-    Company: {company_data['company.name']}
-    Description: {company_data['company.description']}
-    Category: {company_data['company.category.industry']}
-    APIs: {', '.join(df_zapier[df_zapier['ID'] == company_data['ID']]['API Name'].tolist())}
-    
-    Based on the information above, describe AI agents that can replicate what this company offers through its APIs. Focus on the key functionalities and how an AI agent could automate or enhance these processes.
-    Output in Json of agents, with each agent represented as json with the following keys: "Title": "", "AgentDescription": "", "UsedBy": [], "RelatedAPIs": []
-    For example an agent can contain: 
-      "Title": "ChatGPT",
-      "AgentDescription": "ChatGPT is a conversational AI model developed by OpenAI, based on the GPT-4 architecture. It can understand and generate human-like text based on the input it receives.",
-      "UsedBy": ["Businesses for customer support", "Individuals for personal assistance", "Developers for integrating conversational AI into applications"],
-      "RelatedAPIs": ["OpenAI GPT-4 API", "Twilio API", "Slack API"]
-    Constrain response to the json, no other text
-    """
-    
-    data = {
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "model": "claude-3-5-sonnet-20240620",
-        "max_tokens": 1000
-    }
-      
-    response = requests.post(api_url, headers=headers, json=data)
-    
-    if response.status_code == 200:
-        response_json = response.json()
-        agent_text = response_json['content'][0]['text']
-        return agent_text
-    else:
-        return f"Error: {response.status_code} - {response.text}"
-
-def display_ai_agents(agent_data):
-    try:
-        agents_json = json.loads(agent_data)
-        agents = agents_json.get("agents", [])
-    except json.JSONDecodeError:
+@traced("home.agent_cards")
+def display_ai_agents(agents):
+    if not agents:
         st.error("Error decoding agent data")
         return
 
     st.subheader("AI Agent Descriptions")
-    col1, col2 = st.columns(2)
-    for i, agent in enumerate(agents):
-        title = agent.get("Title", "Unknown Agent")
-        description = agent.get("AgentDescription", "No description available.")
-        used_by = agent.get("UsedBy", [])
-        related_apis = agent.get("RelatedAPIs", [])
-        
-        # Create a card with custom CSS
-        card_html = f"""
-        <div style="
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            padding: 16px;
-            margin: 10px 0;
-            background-color: white;
-            box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15);
-            position: relative;
-            overflow: hidden;
-        ">
-            <h5 style="margin-left: 10px; color: #202124; font-family: 'Google Sans',Roboto,Arial,sans-serif;">{title}</h5>
-            <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;">{description}</p>
-            <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;"><b>Used By:</b> {', '.join(used_by)}</p>
-            <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;"><b>Related APIs:</b> {', '.join(related_apis)}</p>
-        </div>
-        """
-        # Alternate between columns
-        if i % 2 == 0:
-            col1.markdown(card_html, unsafe_allow_html=True)
-        else:
-            col2.markdown(card_html, unsafe_allow_html=True)
+    render_card_columns([agent_card(agent) for agent in agents])
+
+# Polls a running ideation job without rerunning the rest of the page, and reruns
+# the page once the job has finished so its result is shown
+@st.experimental_fragment(run_every=2)
+def display_ideation_progress(job_id):
+    from jobs import get_job_queue
+
+    job = get_job_queue().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.info(f"Ideating AI agents... ({job.elapsed:.0f}s)")
+
+# Spans of the current script run and the process-wide percentiles
+def display_trace_panel(trace):
+    with st.sidebar.expander("Timing", expanded=False):
+        st.caption(f"This run: {trace.duration * 1000:.0f} ms")
+        st.caption("Data versions: " + ", ".join(f"{path} {version}" for path, version in data_versions().items()))
+        st.dataframe(
+            pd.DataFrame(
+                [{"span": "  " * s["depth"] + s["name"], "ms": round(s["duration_ms"], 1)} for s in trace.spans],
+                columns=["span", "ms"],
+            ),
+            hide_index=True,
+        )
+        summary = pd.DataFrame.from_dict(metrics.summary(), orient="index")
+        if not summary.empty:
+            st.caption("Recent calls in this process (seconds)")
+            st.dataframe(summary[["calls", "errors", "p50", "p95", "max"]])
 
 def main():
     # Set page config at the very top
     st.set_page_config(page_title="GEB First Addressable Market Explorer", layout="wide")
 
+    if REALTIME:
+        start_listeners()
+
     st.sidebar.title("Navigation")
     page = st.sidebar.radio("Go to", ["Home", "Navigate Agents"])
 
-    if page == "Home":
-        home()
-    elif page == "Navigate Agents":
-        navigate_agents()
+    trace = start_trace("home" if page == "Home" else "navigate_agents")
+    try:
+        if page == "Home":
+            home()
+        elif page == "Navigate Agents":
+            from navigate_agents import navigate_agents
+            navigate_agents()
+    finally:
+        finish_trace(trace)
+
+    if DEBUG_PANEL or st.query_params.get("debug") == "1":
+        display_trace_panel(trace)
 
 def home():
+    from st_aggrid import AgGrid, GridUpdateMode
+    from st_aggrid.grid_options_builder import GridOptionsBuilder
+    import streamlit.components.v1 as components
+    from jobs import DONE, FAILED, get_job_queue, submit_ideation
+
     # Your existing code for the home page goes here
     
     # Add this line to display the app logo
@@ -260,8 +110,10 @@ def home():
     
     st.title("GEB First Addressable Market Explorer")
 
-    df_company = fetch_company_data()
-    df_zapier = fetch_zapier_data()
+    with span("home.load_data"):
+        dataset = load_company_dataset()
+        df_company = dataset.frame
+        zapier = fetch_zapier_data()
 
     name_column = 'company.name'
     domain_column = 'Domain'
@@ -284,48 +136,53 @@ def home():
         default=default_columns
     )
     # Locations filter
-    locations = st.sidebar.multiselect("Select Locations", options=df_company["company.geo.country"].unique().tolist(), default=[])
+    location_facet = dataset.facets["company.geo.country"]
+    locations = st.sidebar.multiselect("Select Locations", options=location_facet.values, format_func=location_facet.label, default=[])
 
     # Sorting
     sort_column = st.sidebar.selectbox("Sort by", options=selected_columns, index=selected_columns.index('company.metrics.employees'))
     sort_ascending = st.sidebar.checkbox("Sort Ascending", value=False)
 
-    # Apply filtering
-    if search_term:
-        df_filtered = df_company[
-            df_company[name_column].str.contains(search_term, case=False, na=False) |
-            df_company[domain_column].str.contains(search_term, case=False, na=False)
-        ]
-    else:
-        df_filtered = df_company
+    # Paging
+    page_size = st.sidebar.selectbox("Rows per page", options=PAGE_SIZES, index=PAGE_SIZES.index(50))
 
-    # Initialize the filter condition as True
-    filter_condition = pd.Series([True] * len(df_company))
-    
-    if locations:
-        filter_condition &= df_company["company.geo.country"].isin(locations)
-
-    # Apply the filter condition
-    df_filtered = df_filtered[filter_condition]
-
-    # Apply sorting
-    df_sorted = df_filtered.sort_values(by=sort_column, ascending=sort_ascending)
+    # Apply filtering
+    with span("home.filter"):
+        filter_mask = dataset.filters.mask(isin={"company.geo.country": locations}, search=search_term)
+
+    # Apply the filter condition to the cached sort order of the column, so only
+    # the rows of the current page are gathered from the frame
+    with span("home.sort"):
+        sort_order = dataset.sort_order(sort_column, sort_ascending)
+        sorted_positions = sort_order[filter_mask[sort_order]]
+
+    # Only the current page is sent to the browser; filtering, sorting and paging
+    # all happen here, so the grid's own sorting and filtering are turned off
+    start, stop = page_window(
+        "company_page", len(sorted_positions), page_size,
+        reset_on=(search_term, locations, sort_column, sort_ascending, page_size),
+        container=st.sidebar,
+    )
+    df_page = df_company.iloc[sorted_positions[start:stop]]
 
     # Table display with AgGrid
     st.subheader("Companies and Services")
-    gb = GridOptionsBuilder.from_dataframe(df_sorted[selected_columns])
-    gb.configure_selection('single', use_checkbox=False)
-    gb.configure_grid_options(domLayout='normal')
-    gridOptions = gb.build()
-
-    grid_response = AgGrid(
-        df_sorted[selected_columns],
-        gridOptions=gridOptions,
-        update_mode=GridUpdateMode.SELECTION_CHANGED,
-        fit_columns_on_grid_load=True,
-        height=400,
-        allow_unsafe_jscode=True
-    )
+    st.caption(f"Showing {start + 1 if stop else 0}–{stop} of {len(sorted_positions)} companies")
+    with span("home.grid"):
+        gb = GridOptionsBuilder.from_dataframe(df_page[selected_columns])
+        gb.configure_default_column(sortable=False, filter=False)
+        gb.configure_selection('single', use_checkbox=False)
+        gb.configure_grid_options(domLayout='normal')
+        gridOptions = gb.build()
+
+        grid_response = AgGrid(
+            df_page[selected_columns],
+            gridOptions=gridOptions,
+            update_mode=GridUpdateMode.SELECTION_CHANGED,
+            fit_columns_on_grid_load=True,
+            height=400,
+            allow_unsafe_jscode=True
+        )
 
     selected_rows = grid_response['selected_rows']
 
@@ -335,19 +192,22 @@ def home():
     company_data = None
     if isinstance(selected_rows, pd.DataFrame) and not selected_rows.empty:
         selected_id = selected_rows.iloc[0]['ID']
-        company_data = df_sorted[df_sorted['ID'] == selected_id].iloc[0]
+        company_data = dataset.row(selected_id)
         st.session_state.ai_agents_loaded = False  # Reset AI agents loaded state
         st.session_state.agent_data = None  # Reset agent data
     elif isinstance(selected_rows, list) and len(selected_rows) > 0:
         selected_id = selected_rows[0]['ID']
-        company_data = df_sorted[df_sorted['ID'] == selected_id].iloc[0]
+        company_data = dataset.row(selected_id)
         st.session_state.ai_agents_loaded = False  # Reset AI agents loaded state
         st.session_state.agent_data = None  # Reset agent data
     
     if company_data is None:
         # Fallback to dropdown selection if no row is selected
-        selected_company = st.selectbox("Switch company", df_sorted[name_column])
-        company_data = df_sorted[df_sorted[name_column] == selected_company].iloc[0]
+        # Options are row positions, so picking a name needs no lookup
+        company_names = df_company[name_column]
+        selected_position = st.selectbox("Switch company", df_page.index, format_func=lambda position: company_names.iat[position])
+        if selected_position is not None:
+            company_data = df_company.iloc[selected_position]
         st.session_state.ai_agents_loaded = False  # Reset AI agents loaded state
         st.session_state.agent_data = None  # Reset agent data
     
@@ -399,20 +259,36 @@ def home():
 
         # Automatically load APIs
         company_id = company_data['ID']
-        display_api_data(company_id, df_zapier)
+        display_api_data(company_id, zapier)
 
         if "ai_agents_loaded" not in st.session_state:
             st.session_state.ai_agents_loaded = False
 
+        # Ideation runs as a background job; the page keeps the job id per company
+        # and picks up the result once the job has finished
+        ideation_jobs = st.session_state.setdefault("ideation_jobs", {})
+        job_queue = get_job_queue()
+
         if st.button("Ideate AI Agents"):
-            agents_data = fetch_agents_from_firebase(company_id)
-            if agents_data:
-                st.session_state.agent_data = agents_data
-            else:
-                agent_data = get_ai_agent_description(company_data, df_zapier)
-                st.session_state.agent_data = agent_data
-                store_agents_in_firebase(company_id, agent_data)
+            agents = fetch_agents_from_firebase(company_id)
+            if agents:
+                st.session_state.agent_data = agents
+                st.session_state.ai_agents_loaded = True
+            elif company_id not in ideation_jobs:
+                ideation_jobs[company_id] = submit_ideation(company_id)
+
+        job = job_queue.get(ideation_jobs.get(company_id))
+        if job is not None and job.status == DONE:
+            del ideation_jobs[company_id]
+            st.session_state.agent_data = job.result
             st.session_state.ai_agents_loaded = True
+        elif job is not None and job.status == FAILED:
+            del ideation_jobs[company_id]
+            st.error(f"Error ideating AI agents: {job.error}")
+        elif job is not None:
+            display_ideation_progress(job.id)
+        else:
+            ideation_jobs.pop(company_id, None)
 
         if st.session_state.ai_agents_loaded:
             display_ai_agents(st.session_state.agent_data)
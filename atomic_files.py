@@ -0,0 +1,29 @@
+import json
+import os
+import tempfile
+
+# Replace `path` in one step: `write_fn(tmp_path)` writes the new content to a
+# temporary file of its own next to `path`, which is then renamed over it. Readers
+# never see a partial file and concurrent writers never share a temporary file;
+# when writing fails, the temporary file is removed and `path` is left as it was.
+def atomic_write(path, write_fn):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}-")
+    os.close(fd)
+    try:
+        result = write_fn(tmp_path)
+        # mkstemp creates the file private to the owner; readable like one from open()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return result
+
+# atomic_write for a JSON document
+def atomic_write_json(path, value, **kwargs):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(value, f, **kwargs)
+    atomic_write(path, write)
@@ -0,0 +1,155 @@
+import argparse
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+
+from agent_store import fetch_agents_data, fetch_stored_agents, parse_agents, store_agents_bulk
+from atomic_files import atomic_write_json
+from data_store import fetch_zapier_data, load_company_dataset
+from firebase_app import sanitize_id
+from ideation import build_prompt, ideation_lock, request_agent_text
+
+# Offline pre-generation of agents for companies that have no usable Agents/<id>
+# entry yet. Uses the same prompt as the "Ideate AI Agents" button, runs a bounded
+# number of requests at a time and records progress in a checkpoint file, so a
+# crashed or interrupted run resumes where it left off.
+CHECKPOINT_PATH = os.getenv("FAM_IDEATION_CHECKPOINT", ".ideation_checkpoint.json")
+
+logger = logging.getLogger(__name__)
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"done": [], "failed": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    atomic_write_json(path, checkpoint, indent=2)
+
+def pending_companies(dataset, agent_table, checkpoint, limit=None):
+    done = set(checkpoint["done"])
+    pending = []
+    for company_id in dataset.id_index:
+        if company_id in done or sanitize_id(company_id) in agent_table:
+            continue
+        pending.append(company_id)
+        if limit and len(pending) >= limit:
+            break
+    return pending
+
+def _backoff(attempt, base):
+    # Exponential backoff with full jitter
+    return random.uniform(0, base * 2 ** attempt)
+
+# Generate agents for one company. Transient API errors are retried by the HTTP
+# client; output that does not parse is requested again. Returns the parsed agents
+# or raises the last error.
+def ideate(company_data, zapier, api_url=None, retries=3, backoff=2.0):
+    prompt = build_prompt(company_data, zapier.api_names(company_data['ID']))
+    for attempt in range(retries + 1):
+        agents = parse_agents(request_agent_text(prompt, api_url, retries))
+        if agents:
+            return agents
+        if attempt < retries:
+            delay = _backoff(attempt, backoff)
+            logger.info("Retrying %s in %.1fs: response did not contain valid agents", company_data['ID'], delay)
+            time.sleep(delay)
+    raise ValueError("Response did not contain valid agents")
+
+# Agents for one company, under the same per-company lock as the app's ideation
+# and re-checked once it is held, as another process may have stored agents while
+# this one waited. Returns (agents, stored, lock): `stored` tells whether they were
+# there already, and `lock` is still held, so the app waits for the result to be
+# written instead of generating it again; close it once they are stored.
+def ideate_locked(company_data, zapier, api_url=None, retries=3, backoff=2.0):
+    lock = ExitStack()
+    lock.enter_context(ideation_lock(company_data['ID']))
+    try:
+        agents = fetch_stored_agents(company_data['ID'])
+        if agents:
+            return agents, True, lock
+        return ideate(company_data, zapier, api_url, retries, backoff), False, lock
+    except BaseException:
+        lock.close()
+        raise
+
+def run(concurrency=4, retries=3, backoff=2.0, batch_size=20, limit=None, checkpoint_path=None, api_url=None):
+    checkpoint_path = checkpoint_path or CHECKPOINT_PATH
+    checkpoint = load_checkpoint(checkpoint_path)
+    dataset = load_company_dataset()
+    zapier = fetch_zapier_data()
+    company_ids = pending_companies(dataset, fetch_agents_data(), checkpoint, limit)
+    logger.info("%d companies without agents", len(company_ids))
+
+    results = {}
+    stored = []
+    locks = ExitStack()
+
+    # Results are written before they are marked done, so a crash can only lose
+    # work that will be redone on the next run; their locks are released after
+    def flush():
+        if not results and not stored:
+            return
+        try:
+            store_agents_bulk(results)
+            checkpoint["done"].extend([*results, *stored])
+            for company_id in [*results, *stored]:
+                checkpoint["failed"].pop(company_id, None)
+            save_checkpoint(checkpoint_path, checkpoint)
+            logger.info("Stored agents for %d companies, %d had them already", len(results), len(stored))
+        finally:
+            results.clear()
+            stored.clear()
+            locks.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(ideate_locked, dataset.row(company_id), zapier, api_url, retries, backoff): company_id
+            for company_id in company_ids
+        }
+        try:
+            for future in as_completed(futures):
+                company_id = futures[future]
+                try:
+                    agents, already_stored, lock = future.result()
+                except Exception as e:
+                    logger.warning("Giving up on %s: %s", company_id, e)
+                    checkpoint["failed"][company_id] = str(e)
+                    save_checkpoint(checkpoint_path, checkpoint)
+                    continue
+                locks.push(lock)
+                if already_stored:
+                    stored.append(company_id)
+                else:
+                    results[company_id] = agents
+                if len(results) + len(stored) >= batch_size:
+                    flush()
+            flush()
+        finally:
+            # On an interrupted run, release the locks of results that were not written
+            pool.shutdown(cancel_futures=True)
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    future.result()[2].close()
+    return checkpoint
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate AI agents for companies that have none")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--retries", type=int, default=3, help="retries per company for API errors and unusable output")
+    parser.add_argument("--backoff", type=float, default=2.0, help="base backoff in seconds")
+    parser.add_argument("--batch-size", type=int, default=20, help="companies per bulk write")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many companies")
+    parser.add_argument("--checkpoint", default=None, help=f"checkpoint file (default {CHECKPOINT_PATH})")
+    parser.add_argument("--api-url", default=None, help="LLM endpoint, e.g. a local stub")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    checkpoint = run(args.concurrency, args.retries, args.backoff, args.batch_size, args.limit, args.checkpoint, args.api_url)
+    print(f"done: {len(checkpoint['done'])}, failed: {len(checkpoint['failed'])}")
+
+if __name__ == "__main__":
+    main()
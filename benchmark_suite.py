@@ -0,0 +1,201 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import streamlit as st
+
+import snapshots
+from agent_store import fetch_agents_data
+from cards import agent_card
+from company_schema import apply_schema
+from data_store import CompanyDataset, load_company_dataset, reset_data, warmup
+from fake_firebase import FakeDatabase
+from firebase_loader import load_records, load_records_serial
+from synthetic_data import generate_tree
+
+# Scale benchmarks on synthetic data served from an in-memory database: loading,
+# snapshot sync, schema conversion, index builds, filtering, search, sorting, card
+# rendering and headless runs of both pages. Each size gets a fresh database and
+# snapshot directory. Reports are JSON; pass --compare with an earlier report to
+# see the change per step.
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Peak resident memory of this process in MB
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if platform.system() == "Darwin" else peak / 2**10
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+class Recorder:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    # Time fn `repeat` times (once if `once`) and record min/median seconds and the
+    # change in resident memory over the first call
+    def measure(self, name, fn, once=False):
+        gc.collect()
+        rss_before = _rss_mb()
+        timings, result = [], None
+        for _ in range(1 if once else self.repeat):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        self.results[name] = {
+            "min_s": min(timings),
+            "median_s": statistics.median(timings),
+            "runs": len(timings),
+            "rss_delta_mb": _rss_mb() - rss_before,
+        }
+        return result
+
+def _apptest_run(page=None, configure=None):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file("app.py", default_timeout=600)
+    at.run()
+    if page is not None:
+        at.sidebar.radio[0].set_value(page).run()
+    if configure is not None:
+        configure(at)
+        at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return at
+
+def _select(label, values):
+    def configure(at):
+        next(m for m in at.sidebar.multiselect if m.label == label).set_value(values)
+    return configure
+
+def run_size(n, repeat=3, apptest=True, latency=0.0, seed=0):
+    recorder = Recorder(repeat)
+    measure = recorder.measure
+    tree = measure("generate", lambda: generate_tree(n, seed), once=True)
+    database = FakeDatabase(tree, latency=latency).install()
+    snapshot_dir, default_snapshot_dir = tempfile.mkdtemp(prefix="fam-bench-"), snapshots.SNAPSHOT_DIR
+    snapshots.SNAPSHOT_DIR = snapshot_dir
+    st.cache_resource.clear()
+    reset_data()
+    try:
+        measure("load_records.serial", lambda: load_records_serial("FinalMergedData"))
+        measure("load_records.sharded", lambda: load_records("FinalMergedData"))
+        measure("snapshot.full_sync", lambda: snapshots.sync_snapshot("FinalMergedData", full=True), once=True)
+        snapshot, manifest = measure("snapshot.incremental_sync", lambda: snapshots.sync_snapshot("FinalMergedData"))
+        frame, _ = measure("schema.apply", lambda: apply_schema(snapshots.records_frame(snapshot)), once=True)
+        _, memory = measure("schema.memory_report", lambda: apply_schema(snapshots.records_frame(snapshot), report=True), once=True)
+        recorder.results["schema.memory_report"].update(memory)
+
+        dataset = CompanyDataset(frame, manifest["version"])
+        measure("index.id", lambda: dataset.id_index, once=True)
+        measure("index.tech", lambda: dataset.tech_index, once=True)
+        measure("index.search", lambda: dataset.search_index, once=True)
+        measure("index.facets", lambda: [dataset.facets[column] for column in
+                                         ("company.category.industry", "company.geo.country", "company.tech")], once=True)
+
+        industries = dataset.facets["company.category.industry"].values[:2]
+        countries = dataset.facets["company.geo.country"].values[:3]
+        techs = dataset.facets["company.tech"].values[:3]
+        filters = dict(isin={"company.category.industry": industries, "company.geo.country": countries}, technologies=techs)
+        mask = measure("filter.cold", lambda: dataset.filters.mask(**filters), once=True)
+        measure("filter.cached", lambda: dataset.filters.mask(**filters))
+        measure("search.cold", lambda: dataset.filters.search("company 12"), once=True)
+        measure("search.cached", lambda: dataset.filters.search("company 12"))
+        order = measure("sort.cold", lambda: dataset.sort_order("company.metrics.employees", False), once=True)
+        measure("sort.filtered_page", lambda: frame.iloc[order[mask[order]][:50]])
+
+        agent_table = fetch_agents_data()
+        agents = [agent for key in agent_table.company_keys() for agent in agent_table.agents(key)]
+        measure("cards.page", lambda: "".join(agent_card(agent) for agent in agents[:50]))
+        measure("cards.all", lambda: "".join(agent_card(agent) for agent in agents), once=True)
+
+        reset_data()
+        measure("data.warmup", warmup, once=True)
+
+        if apptest:
+            st.cache_resource.clear()
+            reset_data()
+            measure("apptest.home.cold", lambda: _apptest_run(), once=True)
+            measure("apptest.home.warm", lambda: _apptest_run())
+            measure("apptest.navigate", lambda: _apptest_run("Navigate Agents"))
+            measure("apptest.navigate.filtered", lambda: _apptest_run(
+                "Navigate Agents", _select("Select Locations", [load_company_dataset().facets["company.geo.country"].values[0]])))
+    finally:
+        database.uninstall()
+        st.cache_resource.clear()
+        reset_data()
+        snapshots.SNAPSHOT_DIR = default_snapshot_dir
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    return {
+        "companies": n,
+        "records": {path: len(values) for path, values in tree.items()},
+        "database_reads": database.reads,
+        "peak_rss_mb": _peak_rss_mb(),
+        "steps": recorder.results,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(sizes=None, repeat=3, apptest=True, latency=0.0, seed=0):
+    return {
+        "commit": _git_commit(),
+        "created": time.time(),
+        "python": platform.python_version(),
+        "latency_s": latency,
+        "results": [run_size(n, repeat, apptest, latency, seed) for n in sizes or DEFAULT_SIZES],
+    }
+
+def print_report(report, baseline=None):
+    previous = {}
+    if baseline is not None:
+        previous = {result["companies"]: result["steps"] for result in baseline["results"]}
+    for result in report["results"]:
+        print(f"{result['companies']} companies (peak RSS {result['peak_rss_mb']:.0f} MB)")
+        for name, step in result["steps"].items():
+            line = f"  {name:<28} {step['min_s'] * 1000:10.1f} ms  {step['rss_delta_mb']:+8.1f} MB"
+            before = previous.get(result["companies"], {}).get(name)
+            if before and before["min_s"]:
+                line += f"  x{step['min_s'] / before['min_s']:.2f} vs {baseline.get('commit') or 'baseline'}"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app on synthetic data of growing size")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="company counts, e.g. 10000 100000 1000000")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per repeated step (the minimum is reported)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per database read")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-apptest", action="store_true", help="skip the headless page runs")
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    parser.add_argument("--compare", default=None, help="earlier JSON report to compare against")
+    args = parser.parse_args()
+    # The pages read their assets relative to the repository root
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    report = run(args.sizes, args.repeat, not args.no_apptest, args.latency, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from html import escape
+
+import streamlit as st
+
+from pagination import load_more_button, load_more_window
+
+# Cards are rendered as one HTML block per column that share the classes below,
+# instead of one element per card with its own inline CSS, so the page payload
+# grows with the card text only. Long lists are shown CARDS_PER_PAGE at a time.
+CARDS_PER_PAGE = 50
+
+# Define Google's yellow and green colors
+GOOGLE_YELLOW = "#FBBC05"
+GOOGLE_GREEN = "#34A853"
+
+CARD_CSS = """<style>
+.fam-card {
+    border: 1px solid #ddd;
+    border-radius: 8px;
+    padding: 16px;
+    margin: 10px 0;
+    background-color: white;
+    box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15);
+    position: relative;
+    overflow: hidden;
+}
+.fam-card h5 { margin-left: 10px; color: #202124; font-family: 'Google Sans',Roboto,Arial,sans-serif; }
+.fam-card p { margin-left: 10px; font-family: Roboto,Arial,sans-serif; }
+.fam-card-accent { position: absolute; top: 0; left: 0; width: 5px; height: 100%; }
+.fam-badge {
+    margin-left: 10px;
+    padding: 2px 8px;
+    color: #fff;
+    border-radius: 12px;
+    font-family: Roboto,Arial,sans-serif;
+    font-size: 0.8em;
+    font-weight: bold;
+}
+.fam-trigger { background-color: """ + GOOGLE_YELLOW + """; }
+.fam-action { background-color: """ + GOOGLE_GREEN + """; }
+</style>"""
+
+# Cards are kept on a single line: markdown would turn indented lines after a
+# blank line into code blocks once several cards are joined
+def agent_card(agent, company_id=None):
+    title = escape(str(agent.get("Title", "Unknown Agent")))
+    description = escape(str(agent.get("AgentDescription", "No description available.")))
+    used_by = escape(", ".join(agent.get("UsedBy", [])))
+    related_apis = escape(", ".join(agent.get("RelatedAPIs", [])))
+    service = f"<p><b>Service:</b> {escape(company_id)}</p>" if company_id is not None else ""
+    return (
+        f'<div class="fam-card">{service}<h5>{title}</h5><p>{description}</p>'
+        f"<p><b>Used By:</b> {used_by}</p><p><b>Related APIs:</b> {related_apis}</p></div>"
+    )
+
+def api_card(api_name, api_type):
+    # Choose color based on API type
+    color_class = "fam-trigger" if api_type == 'Trigger' else "fam-action"
+    return (
+        f'<div class="fam-card"><div class="fam-card-accent {color_class}"></div>'
+        f'<h5>{escape(str(api_name))}</h5><span class="fam-badge {color_class}">{escape(str(api_type))}</span></div>'
+    )
+
+# Lay the cards out alternating between two columns, one markdown element each
+def render_card_columns(cards):
+    st.markdown(CARD_CSS, unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+    col1.markdown("".join(cards[0::2]), unsafe_allow_html=True)
+    col2.markdown("".join(cards[1::2]), unsafe_allow_html=True)
+
+# Render `count` cards built lazily by `make_card(i)`, a page at a time with a
+# "load more" button; the list collapses back to one page when `reset_on` changes
+def render_paged_cards(key, count, make_card, reset_on=None):
+    shown = load_more_window(key, count, CARDS_PER_PAGE, reset_on=reset_on)
+    render_card_columns([make_card(i) for i in range(shown)])
+    if shown < count:
+        st.caption(f"Showing {shown} of {count}")
+        load_more_button(key, count, CARDS_PER_PAGE)
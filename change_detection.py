@@ -0,0 +1,244 @@
+import logging
+import os
+import threading
+import time
+
+from change_log import latest_change, read_changes, replay_changes
+from snapshots import FULL_SYNC_INTERVAL, next_version
+
+# Cheap detection of changes to a Firebase tree, so in-memory data is brought up to
+# date by applying deltas instead of reloading everything. A check reads only the
+# change log entries written since the previous one (change_log.py), so it costs a
+# small query however large the tree is; the records it names are fetched by key.
+# A tree is checked at most every VERSION_CHECK_INTERVAL seconds, and reloaded in
+# full every FULL_SYNC_INTERVAL seconds as a backstop for unannounced writes.
+VERSION_CHECK_INTERVAL = float(os.getenv("FAM_VERSION_CHECK_SECONDS", 60))
+
+logger = logging.getLogger(__name__)
+
+# What changed in a tree since the previous check: keys `written` (added or edited)
+# and `removed`. `full` means the tree has to be reloaded. `records` holds new
+# values that are already known (from realtime events), so they need not be fetched.
+class Delta:
+    def __init__(self, written, removed, full, marker, records=None):
+        self.written = written
+        self.removed = removed
+        self.full = full
+        self.marker = marker
+        self.records = records or {}
+
+    def __repr__(self):
+        return f"Delta(written={len(self.written)}, removed={len(self.removed)}, full={self.full})"
+
+class TreeTracker:
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.marker = None
+        self.last_check = 0.0
+        self.last_full = 0.0
+
+    # Record the state the freshly loaded data corresponds to. Taken before the
+    # load, so anything written during it shows up as a change on the next check.
+    def baseline(self):
+        self.marker = latest_change(self.path)
+        self.last_check = self.last_full = time.time()
+        self.version = next_version(None, self.marker, self.last_full)
+        return self.version
+
+    def due(self, interval=None):
+        interval = VERSION_CHECK_INTERVAL if interval is None else interval
+        return time.time() - self.last_check >= interval
+
+    # The Delta since the last check, or None when nothing changed. The tracker only
+    # moves on once the delta is committed, i.e. after it was applied.
+    def check(self):
+        now = time.time()
+        changes = read_changes(self.path, self.marker)
+        self.last_check = now
+        full = now - self.last_full >= FULL_SYNC_INTERVAL
+        if changes.last == self.marker and not full:
+            return None
+        delta = Delta(changes.written, changes.removed, full, changes.last)
+        logger.info("%s changed: %s", self.path, delta)
+        return delta
+
+    # A Delta from changes pushed by the database instead of a check: `records` are
+    # the new values of written keys, `touched` keys were written below the record
+    # level (their value has to be fetched) and `removed` keys were deleted
+    def event_delta(self, records, touched, removed):
+        removed = set(removed)
+        written = (set(records) | set(touched)) - removed
+        delta = Delta(written, removed, False, self.marker, {key: records[key] for key in written if key in records})
+        logger.info("%s pushed: %s", self.path, delta)
+        return delta
+
+    # A Delta from change log entries pushed by the database ({entry id: entry})
+    # instead of read by a check, or None when they hold nothing after the marker
+    def logged_delta(self, entries):
+        changes = replay_changes(entries, self.marker)
+        if changes.last == self.marker:
+            return None
+        delta = Delta(changes.written, changes.removed, False, changes.last)
+        logger.info("%s logged: %s", self.path, delta)
+        return delta
+
+    def commit(self, delta):
+        self.version = next_version(self.version, delta.marker, delta.written, delta.removed, delta.full)
+        self.marker = delta.marker
+        if delta.full:
+            self.last_full = self.last_check
+
+# A value built from one tree (a frame, an index, a table) that is kept current by
+# applying deltas. `load()` builds it from scratch; `apply(value, delta)` returns
+# the updated value (it may update it in place). Served stale-while-revalidate:
+#   - a cold start serves `load_stale()`, the last-known-good local copy, right
+#     away and loads the current data in the background;
+#   - checks and deltas run in a background thread, readers get the current value
+#     and never wait for Firebase;
+#   - `warm(value)` builds what readers need before a new value is swapped in, and
+#     `retire(previous, value)` releases what the replaced one held after the swap.
+# When Firebase fails, the value being served (stale or not) stays in place.
+class LiveValue:
+    def __init__(self, path, load, apply, interval=None, load_stale=None, warm=None, retire=None):
+        self.tracker = TreeTracker(path)
+        self._load = load
+        self._apply = apply
+        self._interval = interval
+        self._load_stale = load_stale
+        self._warm = warm
+        self._retire = retire
+        self._value = None
+        self.stale = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.tracker.version
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    stale = self._read_stale()
+                    if stale is None:
+                        self._load_fresh()
+                    else:
+                        self._value, self.stale = stale, True
+        if self.tracker.due(self._interval):
+            self._refresh_in_background()
+        return self._value
+
+    # Load the current data now, waiting for Firebase; when that fails, serve the
+    # last-known-good copy if there is one
+    def warmup(self):
+        with self._lock:
+            try:
+                self._load_fresh()
+            except Exception as e:
+                if self._value is None:
+                    stale = self._read_stale()
+                    if stale is None:
+                        raise
+                    self._swap(stale)
+                    self.stale = True
+                self.tracker.last_check = time.time()
+                logger.warning("Loading %s failed, serving the local copy: %s", self.tracker.path, e)
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self.stale = False
+            self.tracker = TreeTracker(self.tracker.path)
+
+    def _read_stale(self):
+        if self._load_stale is None:
+            return None
+        try:
+            return self._load_stale()
+        except Exception as e:
+            logger.warning("Ignoring the local copy of %s: %s", self.tracker.path, e)
+            return None
+
+    # Callers hold the lock
+    def _load_fresh(self):
+        self.tracker.baseline()
+        value = self._load()
+        self._swap(value)
+        self.stale = False
+
+    def _swap(self, value):
+        previous = self._value
+        if value is previous:
+            return
+        if self._warm is not None:
+            self._warm(value)
+        self._value = value
+        if self._retire is not None and previous is not None:
+            try:
+                self._retire(previous, value)
+            except Exception as e:
+                logger.warning("Releasing the previous %s failed: %s", self.tracker.path, e)
+
+    def _refresh_in_background(self):
+        with self._refreshing_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name=f"refresh-{self.tracker.path}", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                if not self.stale:
+                    self.refresh()
+                    return
+                try:
+                    self._load_fresh()
+                except Exception as e:
+                    self.tracker.last_check = time.time()
+                    logger.warning("Revalidating %s failed, serving the local copy: %s", self.tracker.path, e)
+        finally:
+            with self._refreshing_lock:
+                self._refreshing = False
+
+    # Check now and apply any delta; callers hold the lock
+    def refresh(self):
+        try:
+            delta = self.tracker.check()
+            if delta is not None:
+                self._swap(self._apply(self._value, delta))
+                self.tracker.commit(delta)
+        except Exception as e:
+            logger.warning("Refreshing %s failed, serving current data: %s", self.tracker.path, e)
+
+    # Apply changes pushed by a realtime listener (see TreeTracker.event_delta).
+    # Nothing to do before the current data is loaded, which reads them anyway.
+    def apply_events(self, records, touched=(), removed=()):
+        with self._lock:
+            if self._value is None or self.stale:
+                return
+            delta = self.tracker.event_delta(records, touched, removed)
+            if delta.written or delta.removed:
+                self._swap(self._apply(self._value, delta))
+                self.tracker.commit(delta)
+
+    # Apply change log entries pushed by a realtime listener on the tree's log
+    # (see TreeTracker.logged_delta); entries already applied are skipped
+    def apply_log(self, entries):
+        with self._lock:
+            if self._value is None or self.stale:
+                return
+            delta = self.tracker.logged_delta(entries)
+            if delta is not None:
+                self._swap(self._apply(self._value, delta))
+                self.tracker.commit(delta)
+
+    # Check now, waiting for a check another thread is running
+    def force_refresh(self):
+        with self._lock:
+            if self._value is not None and not self.stale:
+                self.refresh()
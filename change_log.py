@@ -0,0 +1,88 @@
+import argparse
+import os
+import time
+
+from firebase_app import reference
+from firebase_loader import firebase_key_order
+
+# Per-write log of changed records. Every writer appends an entry
+#   CHANGE_LOG_NODE/<tree>/<push id> = {"at": time, "keys": [...], "removed": [...]}
+# with push(), whose ids the server hands out in write order, so concurrent writers
+# never overwrite each other's entries. Readers remember the id of the last entry
+# they applied and fetch only the entries after it, a small ordered read.
+# Writers prune entries older than CHANGE_LOG_RETENTION; it has to exceed the full
+# sync interval (FAM_SNAPSHOT_FULL_SYNC_SECONDS), which covers anything older.
+CHANGE_LOG_NODE = os.getenv("FAM_VERSION_NODE", "Versions")
+CHANGE_LOG_RETENTION = float(os.getenv("FAM_CHANGE_LOG_RETENTION_SECONDS", 2 * 24 * 60 * 60))
+PRUNE_BATCH = 50
+
+def log_path(path):
+    return f"{CHANGE_LOG_NODE}/{path}"
+
+def _log(path):
+    return reference(log_path(path))
+
+# Announce that records under `keys` of `path` were written and `removed` deleted
+def record_changes(path, keys=(), removed=()):
+    _log(path).push({"at": time.time(), "keys": sorted(keys), "removed": sorted(removed)})
+    _prune(path)
+
+def _prune(path):
+    cutoff = time.time() - CHANGE_LOG_RETENTION
+    oldest = _log(path).order_by_key().limit_to_first(PRUNE_BATCH).get() or {}
+    expired = {entry_id: None for entry_id, entry in oldest.items() if not isinstance(entry, dict) or entry.get("at", 0) < cutoff}
+    if expired:
+        _log(path).update(expired)
+
+# Id of the newest entry, or None while the log is empty
+def latest_change(path):
+    entries = _log(path).order_by_key().limit_to_last(1).get()
+    return max(entries, key=firebase_key_order) if isinstance(entries, dict) and entries else None
+
+# Keys written and removed by the entries after `after`, replayed in write order
+class Changes:
+    def __init__(self, last):
+        self.last = last
+        self.written = set()
+        self.removed = set()
+
+    def __bool__(self):
+        return bool(self.written or self.removed)
+
+# Replay {entry id: entry} (read from the log, or pushed by a listener on it),
+# skipping the entries up to and including `after`
+def replay_changes(entries, after=None):
+    changes = Changes(after)
+    if not isinstance(entries, dict):
+        return changes
+    for entry_id in sorted(entries, key=firebase_key_order):
+        entry = entries[entry_id]
+        if after is not None and firebase_key_order(entry_id) <= firebase_key_order(after):
+            continue
+        if not isinstance(entry, dict):
+            continue
+        written, removed = set(entry.get("keys") or ()), set(entry.get("removed") or ())
+        changes.written = (changes.written - removed) | written
+        changes.removed = (changes.removed - written) | removed
+        changes.last = entry_id
+    return changes
+
+def read_changes(path, after=None):
+    query = _log(path).order_by_key()
+    if after is not None:
+        query = query.start_at(after)
+    return replay_changes(query.get(), after)
+
+def main():
+    parser = argparse.ArgumentParser(description="Announce records written to a tree outside the app, or show recent changes")
+    parser.add_argument("path")
+    parser.add_argument("keys", nargs="*", help="keys written")
+    parser.add_argument("--removed", nargs="*", default=[], help="keys deleted")
+    args = parser.parse_args()
+    if args.keys or args.removed:
+        record_changes(args.path, args.keys, args.removed)
+    changes = read_changes(args.path)
+    print(f"{args.path}: {len(changes.written)} written, {len(changes.removed)} removed, last entry {changes.last}")
+
+if __name__ == "__main__":
+    main()
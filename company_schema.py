@@ -0,0 +1,123 @@
+import logging
+import sys
+
+import pandas as pd
+
+# Storage types for the company frame. Columns missing from the data are skipped,
+# columns not listed here keep whatever type pandas inferred.
+#   category  - low-cardinality labels used by the sidebar filters
+#   Int64     - whole numbers with missing values (nullable integers)
+#   interned  - repeated strings; equal values share a single object
+COMPANY_SCHEMA = {
+    'company.category.industry': 'category',
+    'company.category.industryGroup': 'category',
+    'company.category.sector': 'category',
+    'company.category.subIndustry': 'category',
+    'company.geo.country': 'category',
+    'company.geo.countryCode': 'category',
+    'company.geo.state': 'category',
+    'company.geo.city': 'category',
+    'company.type': 'category',
+    'company.metrics.employeesRange': 'category',
+    'company.metrics.employees': 'Int64',
+    'company.foundedYear': 'Int64',
+    'company.tech': 'interned',
+    'company.location': 'interned',
+}
+
+logger = logging.getLogger(__name__)
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _to_category(series):
+    # Only plain labels; columns holding lists or dicts are left untouched
+    if not series.dropna().map(type).eq(str).all():
+        return series
+    return series.astype('category')
+
+def _to_nullable_int(series):
+    numbers = pd.to_numeric(series, errors='coerce')
+    # Keep the column as-is if conversion would drop values or fractions
+    if numbers.isna().sum() > series.isna().sum() or (numbers.dropna() % 1 != 0).any():
+        return series
+    return numbers.astype('Int64')
+
+def _to_interned(series):
+    if series.dtype != object:
+        return series
+    return series.map(_intern)
+
+CONVERTERS = {
+    'category': _to_category,
+    'Int64': _to_nullable_int,
+    'interned': _to_interned,
+}
+
+# Like DataFrame.memory_usage(deep=True), but objects shared between rows (such as
+# interned strings) are only counted once
+def memory_usage(frame):
+    total = frame.index.memory_usage()
+    for column in frame.columns:
+        series = frame[column]
+        if series.dtype == object:
+            sizes = {id(value): sys.getsizeof(value) for value in series.to_numpy()}
+            total += series.memory_usage(index=False) + sum(sizes.values())
+        else:
+            total += series.memory_usage(index=False, deep=True)
+    return int(total)
+
+# Convert `frame` to the storage types in `schema`, returning the compact frame and,
+# with `report`, a before/after memory report in bytes (None otherwise). Measuring
+# sizes every object cell, so the data loads leave it off.
+def apply_schema(frame, schema=None, report=False):
+    schema = COMPANY_SCHEMA if schema is None else schema
+    before = memory_usage(frame) if report else None
+    frame = frame.copy()
+    for column, kind in schema.items():
+        if column in frame.columns:
+            frame[column] = CONVERTERS[kind](frame[column])
+    if not report:
+        return frame, None
+    after = memory_usage(frame)
+    logger.info("Company frame memory: %.1f MB -> %.1f MB (%d rows)", before / 2**20, after / 2**20, len(frame))
+    return frame, {"rows": len(frame), "bytes_before": before, "bytes_after": after}
+
+# New `rows` for a frame apply_schema already converted: the rows are converted the
+# same way and the category columns of both get the union of their labels, so the
+# two concatenate without falling back to object columns. Returns (frame, rows).
+# Raises ValueError when the rows do not fit a column's type; converting the whole
+# frame again is the way out then.
+def align_rows(frame, rows, schema=None):
+    rows, _ = apply_schema(rows, schema)
+    frame = frame.copy(deep=False)
+    for column in frame.columns:
+        dtype = frame[column].dtype
+        if not (isinstance(dtype, pd.CategoricalDtype) or dtype == 'Int64'):
+            continue
+        values = rows[column] if column in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+        if values.dtype != dtype and not isinstance(values.dtype, pd.CategoricalDtype) and values.notna().any():
+            raise ValueError(f"New values of {column} do not fit its {dtype} type")
+        if isinstance(dtype, pd.CategoricalDtype) and isinstance(values.dtype, pd.CategoricalDtype):
+            labels = values.cat.categories.difference(dtype.categories, sort=False)
+            if len(labels):
+                dtype = pd.CategoricalDtype(dtype.categories.append(labels))
+                frame[column] = frame[column].cat.set_categories(dtype.categories)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            raise ValueError(f"New values of {column} do not fit its {dtype} type")
+        rows[column] = values.astype(dtype)
+    return frame, rows
+
+def main():
+    from snapshots import load_snapshot, records_frame
+    frame, _ = load_snapshot('FinalMergedData')
+    if frame is None:
+        print("No local FinalMergedData snapshot; run 'python snapshots.py' first")
+        return
+    _, report = apply_schema(records_frame(frame), report=True)
+    print(f"rows:   {report['rows']}")
+    print(f"before: {report['bytes_before'] / 2**20:.1f} MB")
+    print(f"after:  {report['bytes_after'] / 2**20:.1f} MB")
+
+if __name__ == "__main__":
+    main()
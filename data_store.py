@@ -0,0 +1,226 @@
+import logging
+import threading
+from functools import cached_property
+
+import numpy as np
+
+from agent_store import agent_data
+from change_detection import LiveValue
+from company_schema import align_rows, apply_schema
+from facets import FacetCatalog
+from firebase_app import sanitize_id
+from search_index import SearchIndex
+from snapshots import load_snapshot, records_frame, sync_snapshot, sync_snapshot_merge
+from storage import filter_engine, retire_company_tables
+from tech_index import TechIndex
+from tracing import traced
+from zapier_index import ZapierIndex
+
+# Facets shown by the pages' filters
+WARM_FACETS = ('ID', 'company.category.industry', 'company.tech', 'company.geo.country')
+
+logger = logging.getLogger(__name__)
+
+def _first_positions(series):
+    positions = {}
+    for position, value in enumerate(series.to_numpy()):
+        if isinstance(value, str):
+            positions.setdefault(value, position)
+    return positions
+
+# _first_positions of a merged frame (see snapshots.RowMerge) from the one of the
+# previous frame: entries move with their rows, and only values on rows that were
+# dropped or added are looked up again
+def _patched_first_positions(index, merge, previous, series):
+    moved = merge.positions.tolist()
+    values = series.to_numpy()
+    affected = {value for value in previous.to_numpy()[merge.positions < 0] if isinstance(value, str)}
+    affected.update(value for value in values[merge.added] if isinstance(value, str))
+    positions = {value: moved[position] for value, position in index.items() if value not in affected}
+    for position in np.flatnonzero(series.isin(affected).to_numpy()).tolist():
+        positions.setdefault(values[position], position)
+    return positions
+
+# A loaded version of the company data plus the lookup structures derived from it.
+# Structures are built on first use and live as long as this version is served.
+class CompanyDataset:
+    def __init__(self, frame, version):
+        self.frame = frame
+        self.version = version
+        self._sort_orders = {}
+        self._sort_lock = threading.Lock()
+
+    # Primary-key indexes: company ID (raw and as stored under Agents/) to the
+    # position of the first row carrying it
+    @cached_property
+    def id_index(self):
+        return _first_positions(self.frame['ID'])
+
+    # Derived from id_index: the first row of a sanitized ID is the first row of
+    # any of the IDs sanitizing to it
+    @cached_property
+    def sanitized_id_index(self):
+        positions = {}
+        for company_id, position in self.id_index.items():
+            key = sanitize_id(company_id)
+            if position < positions.get(key, position + 1):
+                positions[key] = position
+        return positions
+
+    def row(self, company_id):
+        position = self.id_index.get(company_id)
+        return None if position is None else self.frame.iloc[position]
+
+    @cached_property
+    def tech_index(self):
+        return TechIndex(self.frame['company.tech'])
+
+    @cached_property
+    def search_index(self):
+        return SearchIndex(self.frame['company.name'], self.frame['Domain'])
+
+    # Row positions of the frame sorted by `column` (missing values last, ties in
+    # row order), computed once per column and direction. A sorted, filtered view
+    # is then `order[mask[order]]` rather than a fresh sort of the filtered frame.
+    def sort_order(self, column, ascending=True):
+        key = (column, ascending)
+        order = self._sort_orders.get(key)
+        if order is None:
+            with self._sort_lock:
+                order = self._sort_orders.get(key)
+                if order is None:
+                    values = self.frame[column].reset_index(drop=True)
+                    order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+                    order.flags.writeable = False
+                    self._sort_orders[key] = order
+        return order
+
+    @cached_property
+    def facets(self):
+        return FacetCatalog(self)
+
+    @cached_property
+    def filters(self):
+        return filter_engine(self)
+
+    # This dataset after an incremental snapshot sync, as the `version` the RowMerge
+    # of the snapshot it was loaded from produced. Only the merged-in rows are
+    # converted to the storage types, and the id, tech and search indexes already
+    # built are patched for the rows that moved, left or arrived rather than built
+    # again; facets, filters and sort orders are cheap and start over.
+    def patched(self, merge, version):
+        frame, rows = align_rows(self.frame, records_frame(merge.updates))
+        dataset = CompanyDataset(merge.apply(frame, rows), version)
+        built = self.__dict__
+        if 'id_index' in built:
+            dataset.id_index = _patched_first_positions(self.id_index, merge, self.frame['ID'], dataset.frame['ID'])
+        if 'tech_index' in built:
+            dataset.tech_index = self.tech_index.patched(merge, dataset.frame['company.tech'])
+        if 'search_index' in built:
+            dataset.search_index = self.search_index.patched(merge, dataset.frame['company.name'], dataset.frame['Domain'])
+        return dataset
+
+    # Build the lookup structures the pages use up front, so the first session to
+    # see this version does not pay for them
+    def warm(self):
+        for structure in ('id_index', 'sanitized_id_index', 'tech_index', 'search_index', 'filters'):
+            getattr(self, structure)
+        for column in WARM_FACETS:
+            self.facets[column]
+        self.sort_order('company.metrics.employees', ascending=False)
+
+# Once a new version is served, only it and the one it replaced (still used by
+# requests that started before the swap) keep their query tables
+def _retire_company_dataset(previous, dataset):
+    retire_company_tables({previous.version, dataset.version})
+
+@traced("fetch.company_data")
+def _load_company_dataset():
+    snapshot, manifest = sync_snapshot('FinalMergedData')
+    frame, _ = apply_schema(records_frame(snapshot))
+    return CompanyDataset(frame, manifest['version'])
+
+# The last synced snapshot as it is on disk, without asking Firebase
+def _load_stale_company_dataset():
+    snapshot, manifest = load_snapshot('FinalMergedData')
+    if snapshot is None:
+        return None
+    frame, _ = apply_schema(records_frame(snapshot))
+    return CompanyDataset(frame, manifest['version'])
+
+# Only the changed records are fetched and merged into the snapshot, and the
+# served dataset is patched with them. It is converted and indexed from scratch
+# only after a full download, or when the snapshot moved on without it.
+@traced("fetch.company_data.delta")
+def _apply_company_delta(dataset, delta):
+    snapshot, manifest, merge = sync_snapshot_merge('FinalMergedData', full=delta.full, changed_keys=delta.written,
+                                                    removed_keys=delta.removed, records=delta.records)
+    if manifest['version'] == dataset.version:
+        return dataset
+    if merge is not None and merge.previous_version == dataset.version:
+        try:
+            return dataset.patched(merge, manifest['version'])
+        except ValueError as e:
+            logger.info("Converting all of FinalMergedData again: %s", e)
+    frame, _ = apply_schema(records_frame(snapshot))
+    return CompanyDataset(frame, manifest['version'])
+
+@traced("fetch.zapier_data")
+def _load_zapier_data():
+    snapshot, manifest = sync_snapshot('Zapier_Data')
+    return ZapierIndex(records_frame(snapshot), manifest['version'])
+
+def _load_stale_zapier_data():
+    snapshot, manifest = load_snapshot('Zapier_Data')
+    return None if snapshot is None else ZapierIndex(records_frame(snapshot), manifest['version'])
+
+# Like _apply_company_delta: the served index is patched with the merged records
+@traced("fetch.zapier_data.delta")
+def _apply_zapier_delta(zapier, delta):
+    snapshot, manifest, merge = sync_snapshot_merge('Zapier_Data', full=delta.full, changed_keys=delta.written,
+                                                    removed_keys=delta.removed, records=delta.records)
+    if manifest['version'] == zapier.version:
+        return zapier
+    if merge is not None and merge.previous_version == zapier.version:
+        return zapier.patched(merge, records_frame(snapshot), manifest['version'])
+    return ZapierIndex(records_frame(snapshot), manifest['version'])
+
+# Shared by every page, session and script of the process, and kept current by
+# applying what changed in Firebase rather than reloading everything. Module-level
+# rather than st.cache_resource so CLIs and job threads share them as well. A cold
+# start serves the local snapshots while the current data loads in the background.
+company_data = LiveValue('FinalMergedData', _load_company_dataset, _apply_company_delta,
+                         load_stale=_load_stale_company_dataset, warm=CompanyDataset.warm,
+                         retire=_retire_company_dataset)
+zapier_data = LiveValue('Zapier_Data', _load_zapier_data, _apply_zapier_delta, load_stale=_load_stale_zapier_data)
+
+# Company data served from the local snapshot and topped up with what changed in
+# Firebase; every page and session gets the same read-only dataset
+def load_company_dataset():
+    return company_data.get()
+
+def fetch_company_data():
+    return load_company_dataset().frame
+
+# Zapier APIs grouped by company ID, shared read-only by all sessions
+def fetch_zapier_data():
+    return zapier_data.get()
+
+# Version of each tree as currently served, for caches derived from the data
+def data_versions():
+    return {
+        'FinalMergedData': load_company_dataset().version,
+        'Zapier_Data': fetch_zapier_data().version,
+        'Agents': agent_data.version,
+    }
+
+# Load the current data of every tree and build its indexes, waiting for Firebase
+# (or falling back to the local copies); see warmup.py
+def warmup():
+    for live_value in (company_data, zapier_data, agent_data):
+        live_value.warmup()
+
+# Drop all loaded data; the next read loads it again
+def reset_data():
+    for live_value in (company_data, zapier_data, agent_data):
+        live_value.reset()
@@ -0,0 +1,32 @@
+TECH_COLUMN = 'company.tech'
+
+# Distinct values of one filter column with the number of companies per value,
+# most common first (ties keep order of first appearance)
+class Facet:
+    def __init__(self, counts):
+        self.counts = counts
+        self.values = sorted(counts, key=counts.get, reverse=True)
+
+    def label(self, value):
+        return f"{value} ({self.counts.get(value, 0)})"
+
+# Sidebar options for a CompanyDataset. Each facet is computed on first use and
+# kept for as long as the dataset version is served, so reruns reuse it.
+class FacetCatalog:
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._facets = {}
+
+    def __getitem__(self, column):
+        if column not in self._facets:
+            self._facets[column] = self._build(column)
+        return self._facets[column]
+
+    def _build(self, column):
+        if column == TECH_COLUMN:
+            index = self._dataset.tech_index
+            return Facet({tech: index.count(tech) for tech in index.technologies})
+        series = self._dataset.frame[column]
+        counts = series.value_counts(dropna=True).to_dict()
+        # unique() gives first-appearance order; value_counts() the counts
+        return Facet({value: int(counts[value]) for value in series.dropna().unique().tolist()})
@@ -0,0 +1,217 @@
+import bisect
+import itertools
+import threading
+import time
+
+import firebase_app
+from firebase_loader import firebase_key_order
+
+# In-memory stand-in for the parts of firebase_admin.db the app uses: get() (also
+# shallow), ordered key ranges and pages, set(), update(), push(), delete() and
+# listen().
+# Install it with
+#   FakeDatabase(tree).install()
+# to run the pages, CLIs and benchmarks without a Firebase project. `latency` adds a
+# fixed delay to every read to mimic network round trips.
+class FakeDatabase:
+    def __init__(self, tree=None, latency=0.0):
+        self.tree = tree if tree is not None else {}
+        self.latency = latency
+        self.reads = 0
+        self._lock = threading.RLock()
+        self._sorted_keys = {}
+        self._listeners = []
+
+    def reference(self, path="/"):
+        return FakeReference(self, _split(path))
+
+    def install(self):
+        firebase_app.use_reference_factory(self.reference)
+        return self
+
+    def uninstall(self):
+        firebase_app.use_reference_factory(None)
+
+    def _read(self):
+        self.reads += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _node(self, parts):
+        node = self.tree
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    # Keys of the node at `parts` in Firebase order, cached until the next write
+    def _ordered_keys(self, parts):
+        key = tuple(parts)
+        cached = self._sorted_keys.get(key)
+        if cached is None:
+            node = self._node(parts)
+            keys = sorted(node, key=firebase_key_order) if isinstance(node, dict) else []
+            cached = self._sorted_keys[key] = (keys, [firebase_key_order(k) for k in keys])
+        return cached
+
+    def _write(self, parts, value):
+        with self._lock:
+            self._sorted_keys.clear()
+            if not parts:
+                self.tree = value if isinstance(value, dict) else {}
+                return
+            node = self.tree
+            for part in parts[:-1]:
+                child = node.get(part)
+                if not isinstance(child, dict):
+                    child = node[part] = {}
+                node = child
+            if value is None:
+                node.pop(parts[-1], None)
+            else:
+                node[parts[-1]] = value
+
+    # Deliver change events the way Firebase does: an initial put of the whole node,
+    # then a put or patch with the path of each write relative to the listener
+    def _listen(self, parts, callback):
+        registration = ListenerRegistration(self, parts, callback)
+        with self._lock:
+            self._listeners.append(registration)
+            data = _copy(self._node(parts))
+        callback(Event("put", "/", data))
+        return registration
+
+    def _notify(self, event_type, parts, data):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            depth = len(listener.parts)
+            if listener.parts == parts[:depth]:
+                listener.callback(Event(event_type, "/" + "/".join(parts[depth:]), _copy(data)))
+            elif parts != listener.parts[:len(parts)]:
+                continue
+            elif event_type == "patch":
+                # A multi-path update above the listener: pass on the paths below it
+                children = {}
+                for path, value in data.items():
+                    path_parts = parts + _split(path)
+                    if listener.parts == path_parts[:depth] and len(path_parts) > depth:
+                        children["/".join(path_parts[depth:])] = _copy(value)
+                    elif path_parts == listener.parts[:len(path_parts)]:
+                        children = None
+                        break
+                if children:
+                    listener.callback(Event("patch", "/", children))
+                elif children is None:
+                    listener.callback(Event("put", "/", _copy(self._node(listener.parts))))
+            else:
+                listener.callback(Event("put", "/", _copy(self._node(listener.parts))))
+
+class Event:
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+class ListenerRegistration:
+    def __init__(self, database, parts, callback):
+        self._db = database
+        self.parts = parts
+        self.callback = callback
+
+    def close(self):
+        with self._db._lock:
+            if self in self._db._listeners:
+                self._db._listeners.remove(self)
+
+_push_ids = itertools.count(1)
+
+def _split(path):
+    return [part for part in path.strip("/").split("/") if part]
+
+def _copy(value):
+    # Records are stored as JSON strings, so only the dict structure is copied
+    return {key: _copy(child) for key, child in value.items()} if isinstance(value, dict) else value
+
+class FakeReference:
+    def __init__(self, database, parts, ordered=False, start=None, end=None, first=None, last=None):
+        self._db = database
+        self._parts = parts
+        self._ordered = ordered
+        self._start = start
+        self._end = end
+        self._first = first
+        self._last = last
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._parts)
+
+    def child(self, path):
+        return FakeReference(self._db, self._parts + _split(path))
+
+    def _query(self, **changes):
+        options = dict(ordered=self._ordered, start=self._start, end=self._end, first=self._first, last=self._last)
+        options.update(changes)
+        return FakeReference(self._db, self._parts, **options)
+
+    def order_by_key(self):
+        return self._query(ordered=True)
+
+    def start_at(self, start):
+        return self._query(start=start)
+
+    def end_at(self, end):
+        return self._query(end=end)
+
+    def limit_to_first(self, limit):
+        return self._query(first=limit)
+
+    def limit_to_last(self, limit):
+        return self._query(last=limit)
+
+    def get(self, shallow=False):
+        self._db._read()
+        with self._db._lock:
+            node = self._db._node(self._parts)
+            if not isinstance(node, dict):
+                return node
+            if shallow:
+                return {key: True if isinstance(child, dict) else child for key, child in node.items()}
+            if not self._ordered:
+                return _copy(node)
+            keys, orders = self._db._ordered_keys(self._parts)
+            lo = 0 if self._start is None else bisect.bisect_left(orders, firebase_key_order(self._start))
+            hi = len(keys) if self._end is None else bisect.bisect_right(orders, firebase_key_order(self._end))
+            if self._first is not None:
+                hi = min(hi, lo + self._first)
+            if self._last is not None:
+                lo = max(lo, hi - self._last)
+            return {key: _copy(node[key]) for key in keys[lo:hi]}
+
+    def set(self, value):
+        self._db._write(self._parts, _copy(value))
+        self._db._notify("put", self._parts, value)
+
+    def update(self, values):
+        for path, value in values.items():
+            self._db._write(self._parts + _split(path), _copy(value))
+        self._db._notify("patch", self._parts, values)
+
+    def delete(self):
+        self._db._write(self._parts, None)
+        self._db._notify("put", self._parts, None)
+
+    # Child under a new key; keys sort in push order, like server-generated ids
+    def push(self, value):
+        child = self.child(f"-{next(_push_ids):019d}")
+        child.set(value)
+        return child
+
+    def listen(self, callback):
+        return self._db._listen(self._parts, callback)
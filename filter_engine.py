@@ -0,0 +1,100 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from facets import TECH_COLUMN
+
+# Filtering shared by the Home and Navigate Agents pages. Every facet selection is
+# turned into a boolean row mask once and kept (up to FILTER_CACHE_SIZE masks per
+# dataset version), so changing one facet only computes the mask for that facet
+# and ANDs it with the cached masks of the others.
+FILTER_CACHE_SIZE = int(os.getenv("FAM_FILTER_CACHE_SIZE", 256))
+
+class FilterEngine:
+    def __init__(self, dataset, cache_size=None):
+        self._dataset = dataset
+        self._size = len(dataset.frame)
+        self._cache_size = cache_size or FILTER_CACHE_SIZE
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+        self._all = self._freeze(np.ones(self._size, dtype=bool))
+
+    @staticmethod
+    def _freeze(mask):
+        # Cached masks are shared between sessions, so nobody may modify them
+        mask.flags.writeable = False
+        return mask
+
+    def _cached(self, key, build):
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = self._freeze(build())
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self._cache_size:
+                self._masks.popitem(last=False)
+        return mask
+
+    # Rows whose `column` is one of `values`
+    def isin(self, column, values):
+        values = frozenset(values)
+        if column == TECH_COLUMN:
+            return self.technologies(values)
+        return self._cached(("isin", column, values), lambda: self._isin_mask(column, values))
+
+    # Rows using any (or all) of `technologies`
+    def technologies(self, technologies, match='any'):
+        technologies = frozenset(technologies)
+        return self._cached(("tech", technologies, match), lambda: self._tech_mask(technologies, match))
+
+    # Rows whose name or domain contains `term`
+    def search(self, term):
+        return self._cached(("search", term.lower()), lambda: self._search_mask(term))
+
+    # How masks are computed; storage.SQLiteFilterEngine answers these with queries
+    def _isin_mask(self, column, values):
+        return self._dataset.frame[column].isin(values).to_numpy(dtype=bool)
+
+    def _tech_mask(self, technologies, match):
+        return self._dataset.tech_index.mask(technologies, match)
+
+    def _search_mask(self, term):
+        return self._dataset.search_index.mask(term)
+
+    # Rows matching all given filters: `isin` maps columns to the accepted values,
+    # empty selections are ignored. The result is read-only.
+    def mask(self, isin=None, technologies=None, tech_match='any', search=None):
+        masks = [self.isin(column, values) for column, values in (isin or {}).items() if values]
+        if technologies:
+            masks.append(self.technologies(technologies, tech_match))
+        if search:
+            masks.append(self.search(search))
+        if not masks:
+            return self._all
+        if len(masks) == 1:
+            return masks[0]
+        combined = np.logical_and(masks[0], masks[1])
+        for mask in masks[2:]:
+            combined &= mask
+        return self._freeze(combined)
+
+    # Agents of the companies selected by `mask`, as {company ID: agents} in row
+    # order, joined through the sanitized ID under which Agents/ stores them
+    def agents_for(self, mask, agent_table):
+        index = self._dataset.sanitized_id_index
+        positions = ((index.get(key), key) for key in agent_table.company_keys())
+        return self._collect_agents(sorted((p, key) for p, key in positions if p is not None and mask[p]), agent_table)
+
+    def _collect_agents(self, positions, agent_table):
+        ids = self._dataset.frame["ID"]
+        agents_by_company = {}
+        for position, key in positions:
+            agents = agent_table.agents(key)
+            if agents:
+                agents_by_company[ids.iat[position]] = agents
+        return agents_by_company
@@ -0,0 +1,83 @@
+import streamlit as st
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Where database references are served from: "firebase", or "sqlite" for the local
+# embedded copy (see storage.py)
+STORAGE_BACKEND = os.getenv("FAM_STORAGE_BACKEND", "firebase")
+# Seconds before a database request is given up, so slow reads fail over to the
+# local copies instead of holding up a refresh; unset keeps the client's default
+FIREBASE_TIMEOUT = os.getenv("FAM_FIREBASE_TIMEOUT")
+
+# Function to get Firebase credentials
+def get_firebase_credentials():
+    if os.getenv("FIREBASE_TYPE"):
+        return {
+            "type": os.getenv("FIREBASE_TYPE"),
+            "project_id": os.getenv("FIREBASE_PROJECT_ID"),
+            "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
+            "private_key": os.getenv("FIREBASE_PRIVATE_KEY").replace('\\n', '\n'),
+            "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
+            "client_id": os.getenv("FIREBASE_CLIENT_ID"),
+            "auth_uri": os.getenv("FIREBASE_AUTH_URI"),
+            "token_uri": os.getenv("FIREBASE_TOKEN_URI"),
+            "auth_provider_x509_cert_url": os.getenv("FIREBASE_AUTH_PROVIDER_X509_CERT_URL"),
+            "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_X509_CERT_URL")
+        }
+    else:
+        return {
+            "type": st.secrets["firebase"]["type"],
+            "project_id": st.secrets["firebase"]["project_id"],
+            "private_key_id": st.secrets["firebase"]["private_key_id"],
+            "private_key": st.secrets["firebase"]["private_key"],
+            "client_email": st.secrets["firebase"]["client_email"],
+            "client_id": st.secrets["firebase"]["client_id"],
+            "auth_uri": st.secrets["firebase"]["auth_uri"],
+            "token_uri": st.secrets["firebase"]["token_uri"],
+            "auth_provider_x509_cert_url": st.secrets["firebase"]["auth_provider_x509_cert_url"],
+            "client_x509_cert_url": st.secrets["firebase"]["client_x509_cert_url"]
+        }
+
+# Function to get Firebase database URL
+def get_firebase_database_url():
+    return os.getenv("FIREBASE_DATABASE_URL") or st.secrets["firebase"]["database"]["url"]
+
+# Initialize Firebase if not already initialized. firebase_admin (and the Google
+# auth stack behind it) is imported here rather than at module import, so it only
+# loads once something actually reads from the database.
+def init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(get_firebase_credentials())
+        options = {'databaseURL': get_firebase_database_url()}
+        if FIREBASE_TIMEOUT:
+            options['httpTimeout'] = float(FIREBASE_TIMEOUT)
+        firebase_admin.initialize_app(cred, options)
+
+_reference_factory = None
+
+# Route all database access through `factory(path)` instead of firebase_admin, e.g.
+# an in-memory stand-in for tests, benchmarks and dry runs. None restores Firebase.
+def use_reference_factory(factory):
+    global _reference_factory
+    _reference_factory = factory
+
+# Shared entry point for database references, so scripts outside the app
+# (sync jobs, CLIs) get an initialized Firebase app as well
+def reference(path):
+    if _reference_factory is None and STORAGE_BACKEND == "sqlite":
+        from storage import get_store
+        use_reference_factory(get_store().reference)
+    if _reference_factory is not None:
+        return _reference_factory(path)
+    init_firebase()
+    from firebase_admin import db
+    return db.reference(path)
+
+def sanitize_id(company_id):
+    # Replace periods with commas or any other character that Firebase allows
+    return company_id.replace('.', ',')
@@ -0,0 +1,212 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from firebase_app import reference
+from tracing import traced
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Large trees are read as key ranges fetched concurrently instead of one blocking
+# get(). A shallow read cannot list the keys: it only shortens object children, and
+# every record of these trees is a JSON string, so it returns the whole tree. Keys
+# come from a keys-only index, KEY_INDEX_NODE/<tree> = {key: true}, that writers
+# keep up to date (index_updates), full snapshot syncs refresh from the keys they
+# downloaded and `python firebase_loader.py --build-index` creates. A tree without
+# an index is read with a single get(), like before sharding.
+FETCH_WORKERS = int(os.getenv("FAM_FETCH_WORKERS", 8))
+SHARD_SIZE = int(os.getenv("FAM_FETCH_SHARD_SIZE", 2000))
+KEY_INDEX_NODE = os.getenv("FAM_KEY_INDEX_NODE", "Keys")
+# Decoding runs in-process with orjson when available; a process pool only pays
+# off for very large trees decoded with the standard json module
+DECODE_PROCESSES = int(os.getenv("FAM_DECODE_PROCESSES", 0))
+DECODE_CHUNK_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+# Firebase orders 32-bit integer-like keys numerically, ahead of all other keys
+def firebase_key_order(key):
+    try:
+        number = int(key)
+    except ValueError:
+        return (1, 0, key)
+    if str(number) == key and -2**31 <= number < 2**31:
+        return (0, number, "")
+    return (1, 0, key)
+
+_meter = None
+_meter_lock = threading.Lock()
+
+# Every read goes through here, so benchmarks can count the bytes transferred
+def _get(query, **kwargs):
+    value = query.get(**kwargs)
+    if _meter is not None:
+        size = len(json.dumps(value))
+        with _meter_lock:
+            _meter[0] += size
+    return value
+
+# Count the JSON bytes of all reads made inside the block
+@contextmanager
+def metered():
+    global _meter
+    _meter = [0]
+    try:
+        yield _meter
+    finally:
+        _meter = None
+
+# Keys of `path` from its key index in Firebase order, or None without an index
+def list_keys(path):
+    keys = _get(reference(f"{KEY_INDEX_NODE}/{path}"), shallow=True)
+    return sorted(keys, key=firebase_key_order) if isinstance(keys, dict) else None
+
+# Multi-path update entries that add `keys` to (or drop `removed` from) the index
+# of `path`, to be written together with the records themselves
+def index_updates(path, keys=(), removed=()):
+    updates = {f"{KEY_INDEX_NODE}/{path}/{key}": True for key in keys}
+    updates.update({f"{KEY_INDEX_NODE}/{path}/{key}": None for key in removed})
+    return updates
+
+def build_key_index(path):
+    keys = list(fetch_tree(path))
+    reference(f"{KEY_INDEX_NODE}/{path}").set({key: True for key in keys})
+    return len(keys)
+
+# Ranges between every shard_size-th indexed key. The first and last are open and
+# neighbours share their bound, so records missing from the index are read too.
+def shard_ranges(keys, shard_size=None):
+    shard_size = shard_size or SHARD_SIZE
+    bounds = keys[shard_size::shard_size]
+    return list(zip([None, *bounds], [*bounds, None]))
+
+def fetch_range(path, start, end, limit=None):
+    query = reference(path).order_by_key()
+    if start is not None:
+        query = query.start_at(start)
+    if end is not None:
+        query = query.end_at(end)
+    if limit is not None:
+        query = query.limit_to_first(limit)
+    return _get(query) or {}
+
+# Fetch (start, end) key ranges concurrently; results are merged in range order
+def fetch_ranges(path, ranges, workers=None):
+    data = {}
+    if len(ranges) == 1:
+        data.update(fetch_range(path, *ranges[0]))
+    elif ranges:
+        with ThreadPoolExecutor(max_workers=workers or FETCH_WORKERS) as pool:
+            for chunk in pool.map(lambda bounds: fetch_range(path, *bounds), ranges):
+                data.update(chunk)
+    return data
+
+# With `refresh_index`, the key index is rewritten when it does not list exactly
+# the keys downloaded (or is missing), so the next full read of a tree written
+# outside the app is sharded too
+def fetch_tree(path, workers=None, shard_size=None, refresh_index=False):
+    shard_size = shard_size or SHARD_SIZE
+    keys = list_keys(path)
+    if keys is None or len(keys) <= shard_size:
+        data = _get(reference(path)) or {}
+    else:
+        data = fetch_ranges(path, shard_ranges(keys, shard_size), workers)
+    if refresh_index and data.keys() != set(keys or ()):
+        try:
+            reference(f"{KEY_INDEX_NODE}/{path}").set({key: True for key in data} or None)
+        except Exception as e:
+            logger.warning("Could not refresh the key index of %s: %s", path, e)
+    return data
+
+def loads(value):
+    if orjson is not None:
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            # orjson is strict; values written by json.dumps may contain NaN
+            pass
+    return json.loads(value)
+
+def _decode_chunk(values):
+    return [loads(value) for value in values]
+
+@traced("decode.json")
+def decode_values(values, processes=None):
+    values = list(values)
+    processes = DECODE_PROCESSES if processes is None else processes
+    if processes <= 1 or len(values) <= DECODE_CHUNK_SIZE:
+        return _decode_chunk(values)
+    chunks = [values[i:i + DECODE_CHUNK_SIZE] for i in range(0, len(values), DECODE_CHUNK_SIZE)]
+    parsed_data = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for chunk in pool.map(_decode_chunk, chunks):
+            parsed_data.extend(chunk)
+    return parsed_data
+
+# Decoded records of a tree whose values are JSON strings (FinalMergedData, Zapier_Data)
+def load_records(path, workers=None, processes=None):
+    return decode_values(fetch_tree(path, workers).values(), processes)
+
+# Previous single-request loader, kept as the baseline for benchmarks
+def load_records_serial(path):
+    data = _get(reference(path)) or {}
+    return [json.loads(value) for value in data.values()]
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+# Bytes read by one call, measured outside the timed runs (metering costs time)
+def _bytes_read(fn, *args, **kwargs):
+    with metered() as meter:
+        fn(*args, **kwargs)
+    return meter[0]
+
+def benchmark(path, worker_counts=(1, 4, 8), processes=None, repeat=3):
+    results = []
+    for _ in range(repeat):
+        elapsed, records = _timed(load_records_serial, path)
+        results.append({"path": path, "loader": "serial", "workers": 1, "records": len(records), "seconds": elapsed})
+        for workers in worker_counts:
+            elapsed, records = _timed(load_records, path, workers, processes)
+            results.append({"path": path, "loader": "sharded", "workers": workers, "records": len(records), "seconds": elapsed})
+    transferred = {"serial": _bytes_read(load_records_serial, path), "sharded": _bytes_read(load_records, path, max(worker_counts), processes)}
+    for result in results:
+        result["bytes"] = transferred[result["loader"]]
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and sharded loading of Firebase trees")
+    parser.add_argument("paths", nargs="*", default=["FinalMergedData", "Zapier_Data"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--build-index", action="store_true", help="write the keys-only index of each path instead")
+    args = parser.parse_args()
+    for path in args.paths:
+        if args.build_index:
+            print(f"{path}: indexed {build_key_index(path)} keys under {KEY_INDEX_NODE}/{path}")
+            continue
+        results = benchmark(path, args.workers, args.processes, args.repeat)
+        best, transferred = {}, {}
+        for result in results:
+            label = (result["loader"], result["workers"])
+            best[label] = min(best.get(label, result["seconds"]), result["seconds"])
+            transferred[label] = result["bytes"]
+        baseline, baseline_bytes = best[("serial", 1)], transferred[("serial", 1)]
+        for (loader, workers), seconds in best.items():
+            size = transferred[(loader, workers)]
+            print(f"{path:<20} {loader:<8} workers={workers:<3} {seconds:8.3f}s  x{baseline / seconds:.2f}"
+                  f"  {size / 2**20:8.1f} MB  x{size / max(baseline_bytes, 1):.2f} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import metrics
+
+# One pooled session for outbound API calls: connections are kept alive between
+# calls, every request has connect/read timeouts, and transient failures are
+# retried with jittered exponential backoff.
+CONNECT_TIMEOUT = float(os.getenv("FAM_HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("FAM_HTTP_READ_TIMEOUT", 90))
+MAX_RETRIES = int(os.getenv("FAM_HTTP_RETRIES", 3))
+BACKOFF = float(os.getenv("FAM_HTTP_BACKOFF", 0.5))
+MAX_BACKOFF = 30.0
+POOL_SIZE = int(os.getenv("FAM_HTTP_POOL_SIZE", 16))
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504, 529})
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def _retry_delay(attempt, response, backoff):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF)
+        except ValueError:
+            pass
+    # Full jitter: spread retries from concurrent callers apart
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2 ** attempt))
+
+def request(method, url, metric=None, timeout=None, retries=None, backoff=None, **kwargs):
+    metric = metric or url
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    retries = MAX_RETRIES if retries is None else retries
+    backoff = BACKOFF if backoff is None else backoff
+    for attempt in range(retries + 1):
+        response = None
+        start = time.perf_counter()
+        try:
+            response = get_session().request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.record(metric, time.perf_counter() - start, ok=False)
+            if attempt == retries:
+                raise
+            logger.info("%s %s failed (%s), retrying", method, metric, e)
+        else:
+            ok = response.status_code < 400
+            metrics.record(metric, time.perf_counter() - start, ok=ok)
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                return response
+            logger.info("%s %s returned %d, retrying", method, metric, response.status_code)
+        time.sleep(_retry_delay(attempt, response, backoff))
+
+def post_json(url, payload, headers=None, **kwargs):
+    return request("POST", url, json=payload, headers=headers, **kwargs)
@@ -0,0 +1,117 @@
+import os
+import streamlit as st
+from agent_store import fetch_agents_data, fetch_stored_agents, parse_agents, store_agents_bulk
+from data_store import fetch_zapier_data, load_company_dataset
+from firebase_app import sanitize_id
+from response_cache import cache_key, get_response_cache
+from singleflight import SingleFlight, process_lock
+from tracing import traced
+
+# Settings for agent ideation calls. ANTHROPIC_API_URL can point at a local stub
+# endpoint when exercising the pipeline without the real API.
+API_URL = os.getenv("ANTHROPIC_API_URL", "https://api.anthropic.com/v1/messages")
+MODEL = "claude-3-5-sonnet-20240620"
+MAX_TOKENS = 1000
+
+# Raised for non-200 responses from the messages API
+class IdeationError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"Error: {status_code} - {text}")
+        self.status_code = status_code
+
+def get_api_key():
+    return os.getenv("ANTHROPIC_API_KEY") or st.secrets["anthropic"]["api_key"]
+
+def build_prompt(company_data, api_names):
+    prompt = f"""
+    Company: {company_data['company.name']}
+    Description: {company_data['company.description']}
+    Category: {company_data['company.category.industry']}
+    APIs: {', '.join(api_names)}
+    
+    Based on the information above, describe AI agents that can replicate what this company offers through its APIs. Focus on the key functionalities and how an AI agent could automate or enhance these processes.
+    Output in Json of agents, with each agent represented as json with the following keys: "Title": "", "AgentDescription": "", "UsedBy": [], "RelatedAPIs": []
+    For example an agent can contain: 
+      "Title": "ChatGPT",
+      "AgentDescription": "ChatGPT is a conversational AI model developed by OpenAI, based on the GPT-4 architecture. It can understand and generate human-like text based on the input it receives.",
+      "UsedBy": ["Businesses for customer support", "Individuals for personal assistance", "Developers for integrating conversational AI into applications"],
+      "RelatedAPIs": ["OpenAI GPT-4 API", "Twilio API", "Slack API"]
+    Constrain response to the json, no other text
+    """
+    return prompt
+
+# Transient failures are retried by http_client, imported on the first request so
+# loading this module does not load requests; `retries` overrides its default.
+# Responses are looked up in and stored to the local response cache, per endpoint
+# so a stub's answers never stand in for the real API's; only output that parses
+# into agents is cached, so unusable answers are requested again.
+@traced("llm.request_agent_text")
+def request_agent_text(prompt, api_url=None, retries=None):
+    api_url = api_url or API_URL
+    cache = get_response_cache()
+    key = cache_key(api_url, MODEL, prompt, MAX_TOKENS)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    import http_client
+
+    headers = {
+        "Content-Type": "application/json",
+        "X-API-Key": get_api_key(),
+        "anthropic-version": "2023-06-01" 
+    }
+    
+    data = {
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS
+    }
+      
+    response = http_client.post_json(api_url, data, headers=headers, metric="anthropic.messages", retries=retries)
+    
+    if response.status_code == 200:
+        response_json = response.json()
+        agent_text = response_json['content'][0]['text']
+        if cache is not None and parse_agents(agent_text):
+            cache.put(key, agent_text)
+        return agent_text
+    else:
+        raise IdeationError(response.status_code, response.text)
+
+_ideation_flights = SingleFlight()
+
+# Held while a company's agents are generated and stored, by the app and by
+# batch_ideation alike, so a company is never generated twice at once
+def ideation_lock(company_id):
+    return process_lock(f"ideate:{company_id}")
+
+# Stored agents of a company, generating and storing them first if needed. Reads
+# them without fetch_agents_from_firebase, which reports errors through Streamlit:
+# this runs as a background job, where errors have to raise and fail the job.
+# Concurrent calls for the same company share one generation (and one paid API
+# call); with FAM_LOCK_DIR set this also holds across processes.
+def ideate_company(company_id):
+    agents = fetch_agents_data().agents(sanitize_id(company_id)) or fetch_stored_agents(company_id)
+    if agents:
+        return agents
+    return _ideation_flights.do(company_id, _generate_agents, company_id)
+
+@traced("ideation.generate")
+def _generate_agents(company_id):
+    with ideation_lock(company_id):
+        # Another process may have stored agents while this one waited for the lock
+        agents = fetch_stored_agents(company_id)
+        if agents:
+            return agents
+        company_data = load_company_dataset().row(company_id)
+        if company_data is None:
+            raise KeyError(f"Unknown company {company_id}")
+        prompt = build_prompt(company_data, fetch_zapier_data().api_names(company_id))
+        agents = parse_agents(request_agent_text(prompt))
+        if not agents:
+            raise ValueError("Response did not contain valid agents")
+        store_agents_bulk({company_id: agents})
+        return agents
@@ -0,0 +1,72 @@
+import argparse
+import json
+import subprocess
+import sys
+
+# Import-time profile of the app, taken with `python -X importtime` in a fresh
+# interpreter. Lists the slowest imports and flags heavy modules that should only
+# load on first use; with --budget-ms it fails when startup grows past the budget,
+# so it can run as a CI check.
+DEFAULT_MODULES = ["app"]
+
+# Modules that app startup must not pull in; they are imported when first needed
+DEFERRED_MODULES = ["firebase_admin", "st_aggrid", "navigate_agents", "requests"]
+
+def profile_imports(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return entries
+
+def report(module, top=15):
+    entries = profile_imports(module)
+    loaded = {entry["module"] for entry in entries}
+    total = next((entry["cumulative_ms"] for entry in entries if entry["module"] == module), 0.0)
+    return {
+        "module": module,
+        "total_ms": total,
+        "modules_imported": len(entries),
+        "slowest": sorted(entries, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top],
+        "eager_deferred_modules": [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+def print_report(result):
+    print(f"import {result['module']}: {result['total_ms']:.0f} ms, {result['modules_imported']} modules")
+    for entry in result["slowest"]:
+        print(f"  {entry['cumulative_ms']:8.1f} ms  {entry['self_ms']:8.1f} ms self  {entry['module']}")
+    for name in result["eager_deferred_modules"]:
+        print(f"  warning: {name} is imported at startup")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the import time of the app")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if an import takes longer than this")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    results = [report(module, args.top) for module in args.modules]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print_report(result)
+    over_budget = args.budget_ms is not None and any(result["total_ms"] > args.budget_ms for result in results)
+    if over_budget or any(result["eager_deferred_modules"] for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ideation import ideate_company
+
+# Background work queue shared by every session of a server process (and usable
+# from CLIs). Submitting returns a job id at once; callers poll the job instead
+# of blocking their script run until the work finishes.
+JOB_WORKERS = int(os.getenv("FAM_JOB_WORKERS", 4))
+# Finished jobs are kept this long so slow pollers still find their result
+JOB_RETENTION_SECONDS = 60 * 60
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+class Job:
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.submitted_at
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+class JobQueue:
+    def __init__(self, workers=None):
+        self._pool = ThreadPoolExecutor(max_workers=workers or JOB_WORKERS, thread_name_prefix="fam-job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, name=None, **kwargs):
+        with self._lock:
+            self._prune()
+            job = Job(f"job-{next(self._ids)}", name or getattr(fn, "__name__", "job"))
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+_queue = None
+_queue_lock = threading.Lock()
+
+# Process-wide queue; module-level rather than st.cache_resource, which does not
+# cache outside a Streamlit script run, so the CLI would get a new queue per call
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
+
+def submit_ideation(company_id):
+    return get_job_queue().submit(ideate_company, company_id, name=f"ideate {company_id}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ideate AI agents for companies through the background job queue")
+    parser.add_argument("company_ids", nargs="+")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds to wait for each job")
+    args = parser.parse_args()
+    queue = get_job_queue()
+    job_ids = [submit_ideation(company_id) for company_id in args.company_ids]
+    for job_id in job_ids:
+        job = queue.get(job_id)
+        job.wait(args.timeout)
+        if job.status == DONE:
+            print(f"{job.name}: {len(job.result)} agents in {job.elapsed:.1f}s")
+        elif job.status == FAILED:
+            print(f"{job.name}: failed: {job.error}")
+        else:
+            print(f"{job.name}: still {job.status} after {job.elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
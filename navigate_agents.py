@@ -1,115 +1,57 @@
 import streamlit as st
-import pandas as pd
-import json
-from firebase_admin import db
+from agent_store import fetch_agents_data
+from data_store import load_company_dataset
+from cards import agent_card, render_paged_cards
+from tracing import span, traced
 
-@st.cache_data
-def fetch_company_data():
-    ref = db.reference('FinalMergedData')
-    data = ref.get()
-    parsed_data = [json.loads(value) for value in data.values()]
-    return pd.DataFrame(parsed_data)
-
-@st.cache_data
-def fetch_agents_data():
-    ref = db.reference('Agents')
-    data = ref.get()
-    return data
-
-def sanitize_id(company_id):
-    # Replace periods with commas or any other character that Firebase allows
-    return company_id.replace('.', ',')
-
-def display_agents(agents_by_company):
+@traced("navigate.agent_cards")
+def display_agents(agents_by_company, reset_on=None):
     st.subheader("AI Agents")
-    col1, col2 = st.columns(2)
-    for company_id, agents in agents_by_company.items():
-        for i, agent in enumerate(agents):
-            title = agent.get("Title", "Unknown Agent")
-            description = agent.get("AgentDescription", "No description available.")
-            used_by = agent.get("UsedBy", [])
-            related_apis = agent.get("RelatedAPIs", [])
-            
-            # Create a card with custom CSS
-            card_html = f"""
-            <div style="
-                border: 1px solid #ddd;
-                border-radius: 8px;
-                padding: 16px;
-                margin: 10px 0;
-                background-color: white;
-                box-shadow: 0 1px 2px 0 rgba(60,64,67,0.3), 0 1px 3px 1px rgba(60,64,67,0.15);
-                position: relative;
-                overflow: hidden;
-            ">
-                <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;"><b>Service:</b> {company_id}</p>
-                <h5 style="margin-left: 10px; color: #202124; font-family: 'Google Sans',Roboto,Arial,sans-serif;">{title}</h5>
-                <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;">{description}</p>
-                <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;"><b>Used By:</b> {', '.join(used_by)}</p>
-                <p style="margin-left: 10px; font-family: Roboto,Arial,sans-serif;"><b>Related APIs:</b> {', '.join(related_apis)}</p>
-            </div>
-            """
-            # Alternate between columns
-            if i % 2 == 0:
-                col1.markdown(card_html, unsafe_allow_html=True)
-            else:
-                col2.markdown(card_html, unsafe_allow_html=True)
+    cards = [(company_id, agent) for company_id, agents in agents_by_company.items() for agent in agents]
+    render_paged_cards("agent_cards", len(cards), lambda i: agent_card(cards[i][1], cards[i][0]), reset_on=reset_on)
 
 def navigate_agents():
     st.title("Navigate AI Agents")
     
-    df_company = fetch_company_data()
-    agents_data = fetch_agents_data()
+    with span("navigate.load_data"):
+        dataset = load_company_dataset()
+        agent_table = fetch_agents_data()
 
-    if not agents_data:
+    if not len(agent_table):
         st.info("No agents data available.")
         return
 
-    # Sanitize the keys in agents_data
-    agents_data = {sanitize_id(key): value for key, value in agents_data.items()}
-
     # Sidebar for filtering options
     st.sidebar.header("Filter Companies")
     
-    company_ids = st.sidebar.multiselect("Select Company IDs", options=df_company["ID"].unique().tolist(), default=[])
-    industries = st.sidebar.multiselect("Select Industries", options=df_company["company.category.industry"].unique().tolist(), default=[])
-    technologies = st.sidebar.multiselect("Select Technologies", options=df_company["company.tech"].str.split(', ').explode().unique().tolist(), default=[])
-    locations = st.sidebar.multiselect("Select Locations", options=df_company["company.geo.country"].unique().tolist(), default=[])
-
-
-    # Initialize the filter condition as True
-    filter_condition = pd.Series([True] * len(df_company))
-
-    if company_ids:
-        filter_condition &= df_company["ID"].isin(company_ids)
-    if industries:
-        filter_condition &= df_company["company.category.industry"].isin(industries)
-    if technologies:
-        tech_filter = df_company["company.tech"].str.split(', ').apply(lambda x: any(tech in technologies for tech in x) if isinstance(x, list) else False)
-        filter_condition &= tech_filter
-    if locations:
-        filter_condition &= df_company["company.geo.country"].isin(locations)
-
-
-    # Apply the filter condition
-    filtered_companies = df_company[filter_condition]
-    filtered_company_ids = filtered_companies["ID"].unique()
-
-    # Collect agents for filtered companies
-    filtered_agents_by_company = {}
-
-    for company_id in filtered_company_ids:
-        sanitized_id = sanitize_id(company_id)
-        if sanitized_id in agents_data:
-            company_agents = agents_data[sanitized_id]
-            if isinstance(company_agents, str):
-                # Parse the JSON string
-                company_agents = json.loads(company_agents)
-            if "agents" in company_agents:
-                filtered_agents_by_company[company_id] = company_agents["agents"]
+    facets = dataset.facets
+    company_ids = st.sidebar.multiselect("Select Company IDs", options=facets["ID"].values, default=[])
+    industry_facet = facets["company.category.industry"]
+    industries = st.sidebar.multiselect("Select Industries", options=industry_facet.values, format_func=industry_facet.label, default=[])
+    tech_facet = facets["company.tech"]
+    technologies = st.sidebar.multiselect("Select Technologies", options=tech_facet.values, format_func=tech_facet.label, default=[])
+    tech_match = st.sidebar.radio("Match technologies", ["any", "all"], horizontal=True)
+    location_facet = facets["company.geo.country"]
+    locations = st.sidebar.multiselect("Select Locations", options=location_facet.values, format_func=location_facet.label, default=[])
+
+    # Apply filtering
+    with span("navigate.filter"):
+        filter_mask = dataset.filters.mask(
+            isin={
+                "ID": company_ids,
+                "company.category.industry": industries,
+                "company.geo.country": locations,
+            },
+            technologies=technologies,
+            tech_match=tech_match,
+        )
+
+    # Join agents to the filtered companies through the ID index
+    with span("navigate.join"):
+        filtered_agents_by_company = dataset.filters.agents_for(filter_mask, agent_table)
 
     if filtered_agents_by_company:
-        display_agents(filtered_agents_by_company)
+        display_agents(filtered_agents_by_company, reset_on=(company_ids, industries, technologies, tech_match, locations))
     else:
         st.info("No agents match the selected criteria.")
 
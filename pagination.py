@@ -0,0 +1,41 @@
+import math
+
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Start the widget `key` over at `value` whenever `signature` (e.g. the active
+# filters) differs from the previous script run
+def _reset_on_change(key, signature, value):
+    signature_key = f"{key}_signature"
+    if st.session_state.get(signature_key) != signature:
+        st.session_state[signature_key] = signature
+        st.session_state[key] = value
+
+# Page picker for `total` rows; returns the (start, stop) slice of the current page.
+# The page goes back to 1 when `reset_on` changes.
+def page_window(key, total, page_size, reset_on=None, container=st):
+    n_pages = max(1, math.ceil(total / page_size))
+    _reset_on_change(key, repr(reset_on), 1)
+    if st.session_state.get(key, 1) > n_pages:
+        st.session_state[key] = n_pages
+    page = container.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key=key)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    return start, stop
+
+# Number of items to show out of `total` when they are revealed `step` at a time by
+# load_more_button; goes back to one step when `reset_on` changes
+def load_more_window(key, total, step, reset_on=None):
+    _reset_on_change(key, repr(reset_on), step)
+    return min(st.session_state.get(key, step), total)
+
+def _show_more(key, step):
+    st.session_state[key] = st.session_state.get(key, step) + step
+
+# The button is handled in a callback, so it can be drawn below the items it
+# extends and still take effect on the run it triggers
+def load_more_button(key, total, step, container=st):
+    remaining = total - min(st.session_state.get(key, step), total)
+    if remaining > 0:
+        container.button(f"Load more ({remaining} remaining)", key=f"{key}_more", on_click=_show_more, args=(key, step))
@@ -0,0 +1,29 @@
+import numpy as np
+
+# Posting lists shared by the inverted indexes (tech_index.py, search_index.py): a
+# dict from term to the ascending int32 row positions holding it. When rows of the
+# dataset change (see snapshots.RowMerge) the lists are patched rather than rebuilt.
+
+# Postings after rows moved: `positions[row]` is the new position of each row, -1
+# when it was dropped, and surviving rows keep their relative order, so every list
+# stays sorted. All lists are remapped in one array operation; terms left without
+# rows are dropped.
+def remap_postings(postings, positions):
+    terms = list(postings)
+    if not terms:
+        return {}
+    lengths = np.fromiter((len(postings[term]) for term in terms), dtype=np.int64, count=len(terms))
+    moved = positions[np.concatenate([postings[term] for term in terms])]
+    kept = moved >= 0
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = np.add.reduceat(kept.astype(np.int64), starts)
+    lists = np.split(moved[kept], np.cumsum(counts)[:-1])
+    return {term: rows for term, rows, count in zip(terms, lists, counts) if count}
+
+# Add {term: new row positions} to `postings` (modified in place)
+def add_postings(postings, additions):
+    for term, rows in additions.items():
+        rows = np.asarray(rows, dtype=np.int32)
+        current = postings.get(term)
+        postings[term] = np.sort(rows) if current is None else np.sort(np.concatenate([current, rows]))
+    return postings
@@ -0,0 +1,208 @@
+import argparse
+import logging
+import os
+import threading
+import time
+
+from change_log import log_path
+from firebase_app import reference
+
+# Optional realtime updates: listeners subscribe to Firebase change events and
+# apply them to the shared in-memory data, so new agents and edited records show up
+# without waiting for the next check. Enable it with FAM_REALTIME=1.
+#   - Agents is small and written as whole records, so its listener receives the
+#     new values themselves (see LiveValue.apply_events).
+#   - FinalMergedData and Zapier_Data are large: listening on them directly would
+#     download the whole tree with the first event. Their listeners follow the
+#     small change log instead (CHANGE_LOG_NODE/<tree>, see change_log.py) and each
+#     new entry becomes a Delta whose records are fetched by key (LiveValue.apply_log).
+# Events arriving within REALTIME_BATCH_SECONDS of each other are applied
+# together, so a burst of writes patches the data once. Polling (change_detection)
+# stays on as a safety net for dropped connections.
+REALTIME = os.getenv("FAM_REALTIME") == "1"
+REALTIME_BATCH_SECONDS = float(os.getenv("FAM_REALTIME_BATCH_SECONDS", 1))
+# Trees followed through their change log rather than listened to directly
+LOGGED_TREES = ("FinalMergedData", "Zapier_Data")
+
+logger = logging.getLogger(__name__)
+
+# Listens on `path` and applies what arrived in batches on a thread of its own.
+# Subclasses record events (called on the database client's thread, under
+# self._pending) and apply them.
+class _Listener:
+    def __init__(self, live_value, path, batch_seconds=None):
+        self.live_value = live_value
+        self.path = path
+        self.batch_seconds = REALTIME_BATCH_SECONDS if batch_seconds is None else batch_seconds
+        self.events = 0
+        self._closed = False
+        self._pending = threading.Condition()
+        self._registration = None
+        self._thread = None
+
+    def start(self):
+        self._registration = reference(self.path).listen(self._on_event)
+        self._thread = threading.Thread(target=self._run, name=f"realtime-{self.path}", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._registration is not None:
+            self._registration.close()
+        with self._pending:
+            self._closed = True
+            self._pending.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _on_event(self, event):
+        parts = [part for part in event.path.strip("/").split("/") if part]
+        with self._pending:
+            self.events += 1
+            self._record_event(event, parts)
+            self._pending.notify()
+
+    def _run(self):
+        while True:
+            with self._pending:
+                while not (self._closed or self._has_changes()):
+                    self._pending.wait()
+                if self._closed:
+                    return
+            time.sleep(self.batch_seconds)
+            with self._pending:
+                changes = self._take_changes()
+            try:
+                self._apply(changes)
+            except Exception as e:
+                logger.warning("Applying changes to %s failed, the next check picks them up: %s", self.live_value.tracker.path, e)
+
+# Listens on the tree itself. A put replaces the value at `path`, a patch updates
+# the children it names.
+class TreeListener(_Listener):
+    def __init__(self, live_value, batch_seconds=None):
+        super().__init__(live_value, live_value.tracker.path, batch_seconds)
+        self._records = {}
+        self._touched = set()
+        self._removed = set()
+        self._resync = False
+
+    def _record_event(self, event, parts):
+        if event.event_type == "patch":
+            for child, value in (event.data or {}).items():
+                self._record(parts + child.split("/"), value)
+        elif not parts:
+            # The first event carries the whole tree; the data is loaded
+            # already, so it is only reconciled with a regular check
+            self._resync = True
+        else:
+            self._record(parts, event.data)
+
+    def _record(self, parts, value):
+        key = parts[0]
+        if len(parts) > 1:
+            self._touched.add(key)
+            self._records.pop(key, None)
+        elif value is None:
+            self._removed.add(key)
+            self._records.pop(key, None)
+            self._touched.discard(key)
+        else:
+            self._records[key] = value
+            self._removed.discard(key)
+
+    def _has_changes(self):
+        return self._resync or self._records or self._touched or self._removed
+
+    def _take_changes(self):
+        changes = self._records, self._touched, self._removed, self._resync
+        self._records, self._touched, self._removed, self._resync = {}, set(), set(), False
+        return changes
+
+    def _apply(self, changes):
+        records, touched, removed, resync = changes
+        if resync:
+            self.live_value.force_refresh()
+        if records or touched or removed:
+            self.live_value.apply_events(records, touched - removed, removed)
+
+# Listens on the change log of the tree. The first event carries the retained
+# entries, later ones each new entry; entries the data has seen already are
+# skipped when applied, and pruned entries (deletions) are ignored.
+class ChangeLogListener(_Listener):
+    def __init__(self, live_value, batch_seconds=None):
+        super().__init__(live_value, log_path(live_value.tracker.path), batch_seconds)
+        self._entries = {}
+
+    def _record_event(self, event, parts):
+        if event.event_type == "patch":
+            entries = {child: value for child, value in (event.data or {}).items() if "/" not in child}
+        elif not parts:
+            entries = event.data if isinstance(event.data, dict) else {}
+        elif len(parts) == 1:
+            entries = {parts[0]: event.data}
+        else:
+            # Entries are pushed whole; anything else is left to the next check
+            return
+        self._entries.update((entry_id, entry) for entry_id, entry in entries.items() if isinstance(entry, dict))
+
+    def _has_changes(self):
+        return bool(self._entries)
+
+    def _take_changes(self):
+        entries, self._entries = self._entries, {}
+        return entries
+
+    def _apply(self, entries):
+        self.live_value.apply_log(entries)
+
+_listeners = None
+_listeners_lock = threading.Lock()
+
+# Start one listener per served tree, once per process. Returns the listeners, or
+# an empty list when the database client cannot listen (e.g. the SQLite backend).
+def start_listeners(batch_seconds=None):
+    global _listeners
+    if _listeners is None:
+        with _listeners_lock:
+            if _listeners is None:
+                from agent_store import agent_data
+                from data_store import company_data, zapier_data
+                listeners = []
+                for live_value in (agent_data, company_data, zapier_data):
+                    listener = ChangeLogListener if live_value.tracker.path in LOGGED_TREES else TreeListener
+                    try:
+                        listeners.append(listener(live_value, batch_seconds).start())
+                    except (AttributeError, NotImplementedError) as e:
+                        logger.warning("Realtime updates unavailable for %s: %s", live_value.tracker.path, e)
+                _listeners = listeners
+    return _listeners
+
+def stop_listeners():
+    global _listeners
+    with _listeners_lock:
+        for listener in _listeners or []:
+            listener.close()
+        _listeners = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the data and keep it, and the local snapshots, current from Firebase change events")
+    parser.add_argument("--batch-seconds", type=float, default=None, help="how long to collect events before applying them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    from agent_store import fetch_agents_data
+    from data_store import data_versions, fetch_zapier_data, load_company_dataset
+    load_company_dataset()
+    fetch_zapier_data()
+    fetch_agents_data()
+    listeners = start_listeners(args.batch_seconds)
+    print(f"Listening to {', '.join(listener.path for listener in listeners) or 'nothing'}; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(30)
+            print(data_versions())
+    except KeyboardInterrupt:
+        stop_listeners()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk cache of LLM responses addressed by a hash of (endpoint, model, prompt,
+# max_tokens), so an identical prompt to the same API is answered once no matter
+# which company ID or re-import it comes from. Bounded by total size (least
+# recently used entries are evicted first) and by age. An empty
+# FAM_RESPONSE_CACHE_PATH disables it. Hits, misses and evictions are counted in
+# the same file, so `python response_cache.py stats` covers every process using it.
+CACHE_PATH = os.getenv("FAM_RESPONSE_CACHE_PATH", ".cache/llm_responses.sqlite3")
+MAX_BYTES = int(os.getenv("FAM_RESPONSE_CACHE_MAX_BYTES", 256 * 2**20))
+TTL_SECONDS = float(os.getenv("FAM_RESPONSE_CACHE_TTL_SECONDS", 30 * 24 * 60 * 60))
+COUNTERS = ["hits", "misses", "evictions"]
+
+def cache_key(endpoint, model, prompt, max_tokens):
+    return hashlib.sha256(json.dumps([endpoint, model, prompt, max_tokens]).encode()).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path, max_bytes=None, ttl=None):
+        self.max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = TTL_SECONDS if ttl is None else ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [(name,) for name in COUNTERS])
+
+    def _count(self, name, amount=1):
+        if amount:
+            self._db.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode()), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._count("evictions", self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount)
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries from least recently used until enough bytes are freed
+        freed, stale = 0, []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self._count("evictions", len(stale))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            counters = dict(self._db.execute("SELECT name, value FROM counters"))
+        return {"entries": entries, "bytes": size, **{name: counters.get(name, 0) for name in COUNTERS}}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Process-wide cache, or None when caching is disabled
+def get_response_cache():
+    global _cache
+    if _cache is None and CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(CACHE_PATH)
+    return _cache
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    args = parser.parse_args()
+    cache = get_response_cache()
+    if cache is None:
+        print("Response cache is disabled (FAM_RESPONSE_CACHE_PATH is empty)")
+        return
+    if args.command == "clear":
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import copy
+
+import numpy as np
+
+from postings import add_postings, remap_postings
+
+GRAM_SIZE = 3
+
+# Exact matches rank before prefix matches, which rank before other substrings
+RANK_EXACT, RANK_PREFIX, RANK_SUBSTRING = 0, 1, 2
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else None
+
+def _grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+# Case-insensitive substring index over one or more text columns (company name and
+# domain), built once per dataset. Every 1-, 2- and 3-character gram maps to the
+# sorted row positions containing it; a query intersects the postings of its own
+# grams and only verifies the few candidates left, instead of scanning every row.
+class SearchIndex:
+    def __init__(self, *columns):
+        self.size = len(columns[0]) if columns else 0
+        self.texts = [[_lower(value) for value in column.to_numpy()] for column in columns]
+        postings = {}
+        for position in range(self.size):
+            for gram in self._row_grams(position):
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.asarray(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def _row_grams(self, position):
+        grams = set()
+        for texts in self.texts:
+            text = texts[position]
+            if text:
+                for size in range(1, GRAM_SIZE + 1):
+                    grams |= _grams(text, size)
+        return grams
+
+    # This index for the frame a snapshots.RowMerge produced, given its text columns:
+    # postings move with their rows and only the merged-in rows are split into grams
+    def patched(self, merge, *columns):
+        index = copy.copy(self)
+        index.size = len(columns[0]) if columns else 0
+        moved = merge.positions >= 0
+        index.texts = []
+        for texts, column in zip(self.texts, columns):
+            patched = np.empty(index.size, dtype=object)
+            patched[merge.positions[moved]] = np.asarray(texts, dtype=object)[moved]
+            patched[merge.added] = [_lower(value) for value in column.to_numpy()[merge.added]]
+            index.texts.append(patched.tolist())
+        additions = {}
+        for position in merge.added.tolist():
+            for gram in index._row_grams(position):
+                additions.setdefault(gram, []).append(position)
+        index.postings = add_postings(remap_postings(self.postings, merge.positions), additions)
+        return index
+
+    def _candidates(self, term):
+        if len(term) <= GRAM_SIZE:
+            return self.postings.get(term, np.empty(0, dtype=np.int32))
+        lists = [self.postings.get(gram) for gram in _grams(term, GRAM_SIZE)]
+        if any(positions is None for positions in lists):
+            return np.empty(0, dtype=np.int32)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for positions in lists[1:]:
+            candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        return candidates
+
+    def _rank(self, term, position):
+        rank = None
+        for texts in self.texts:
+            text = texts[position]
+            if not text or term not in text:
+                continue
+            if text == term:
+                return RANK_EXACT
+            current = RANK_PREFIX if text.startswith(term) else RANK_SUBSTRING
+            rank = current if rank is None else min(rank, current)
+        return rank
+
+    # Row positions whose texts contain `term` (case-insensitive), in row order
+    def matches(self, term):
+        term = term.lower()
+        if not term:
+            return np.arange(self.size, dtype=np.int32)
+        candidates = self._candidates(term)
+        # Short terms are grams themselves, so their postings need no verification
+        if len(term) <= GRAM_SIZE:
+            return candidates
+        return np.asarray([
+            position for position in candidates.tolist()
+            if any(texts[position] and term in texts[position] for texts in self.texts)
+        ], dtype=np.int32)
+
+    # Same rows as matches(), best matches first and in row order within a rank
+    def search(self, term):
+        positions = self.matches(term).tolist()
+        term = term.lower()
+        if not term:
+            return np.asarray(positions, dtype=np.int32)
+        ranked = sorted((self._rank(term, position), position) for position in positions)
+        return np.asarray([position for _, position in ranked], dtype=np.int32)
+
+    def mask(self, term):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.matches(term)] = True
+        return mask
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Directory for cross-process lock files. Unset means locking stays within the
+# process; point all app servers and batch jobs on a host at the same directory.
+LOCK_DIR = os.getenv("FAM_LOCK_DIR")
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# Coalesces concurrent calls with the same key: the first caller (the leader)
+# runs the function, later callers wait for and share its result or exception.
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn(*args, **kwargs)
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self, key):
+        return key in self._calls
+
+# Exclusive lock on `key` shared by all processes using the same lock directory.
+# A no-op when no directory is configured or the platform has no flock().
+@contextmanager
+def process_lock(key, lock_dir=None):
+    lock_dir = lock_dir or LOCK_DIR
+    if not lock_dir or fcntl is None:
+        yield
+        return
+    os.makedirs(lock_dir, exist_ok=True)
+    path = os.path.join(lock_dir, hashlib.sha1(key.encode()).hexdigest() + ".lock")
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,240 @@
+import argparse
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import atomic_write, atomic_write_json
+from change_log import latest_change, read_changes
+from firebase_loader import decode_values, fetch_ranges, fetch_tree, firebase_key_order
+
+# Local, columnar copies of Firebase trees whose values are JSON-encoded records
+# (FinalMergedData, Zapier_Data). The decoded frame is stored as Parquet next to a
+# small manifest, so a cold start reads it from disk instead of downloading and
+# json-decoding the whole tree.
+SNAPSHOT_DIR = os.getenv("FAM_SNAPSHOT_DIR", ".snapshots")
+# Announced writes are picked up from the change log; anything written without an
+# announcement is picked up by a periodic full sync.
+FULL_SYNC_INTERVAL = int(os.getenv("FAM_SNAPSHOT_FULL_SYNC_SECONDS", 24 * 60 * 60))
+KEY_COLUMN = "__firebase_key__"
+
+logger = logging.getLogger(__name__)
+
+def snapshot_paths(path, snapshot_dir=None):
+    name = path.strip('/').replace('/', '__')
+    base = os.path.join(snapshot_dir or SNAPSHOT_DIR, name)
+    return f"{base}.snapshot", f"{base}.manifest.json"
+
+def decode_records(data):
+    # Decode a {key: json string} tree into a frame, keeping the key as a column
+    keys = list(data.keys())
+    parsed_data = decode_values(data.values())
+    frame = pd.DataFrame(parsed_data, index=pd.RangeIndex(len(parsed_data)))
+    frame.insert(0, KEY_COLUMN, keys)
+    return frame
+
+def records_frame(frame):
+    # The frame handed to the pages: original columns only, positional index
+    return frame.drop(columns=KEY_COLUMN).reset_index(drop=True)
+
+def load_snapshot(path, snapshot_dir=None):
+    data_path, manifest_path = snapshot_paths(path, snapshot_dir)
+    if not (os.path.exists(data_path) and os.path.exists(manifest_path)):
+        return None, None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("format") == "pickle":
+            frame = pd.read_pickle(data_path)
+        else:
+            frame = pd.read_parquet(data_path)
+    except Exception as e:
+        logger.warning("Ignoring unreadable snapshot for %s: %s", path, e)
+        return None, None
+    return frame, manifest
+
+_save_lock = threading.Lock()
+
+def save_snapshot(path, frame, manifest, snapshot_dir=None):
+    data_path, manifest_path = snapshot_paths(path, snapshot_dir)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+    def write_data(tmp_path):
+        try:
+            frame.to_parquet(tmp_path, index=False)
+            manifest["format"] = "parquet"
+        except Exception as e:
+            # Columns mixing Python types cannot be written to Parquet; keep them as-is
+            logger.info("Falling back to pickle snapshot for %s: %s", path, e)
+            frame.to_pickle(tmp_path)
+            manifest["format"] = "pickle"
+
+    # Replace the data file first; a manifest is only ever next to a complete file,
+    # and the lock keeps concurrent saves from pairing one's data with another's manifest
+    with _save_lock:
+        atomic_write(data_path, write_data)
+        atomic_write_json(manifest_path, manifest, indent=2)
+
+# Group the wanted keys into runs that are contiguous in `keys` (known keys in
+# Firebase order), so each run can be fetched with a single range query
+def key_runs(keys, wanted):
+    runs = []
+    start = end = None
+    for key in keys:
+        if key in wanted:
+            if start is None:
+                start = key
+            end = key
+        elif start is not None:
+            runs.append((start, end))
+            start = None
+    if start is not None:
+        runs.append((start, end))
+    return runs
+
+# Fetch the `wanted` records, grouped into ranges along the `known` keys (a list in
+# Firebase key order); keys missing from the result no longer exist
+def fetch_keys(path, known, wanted):
+    new_keys = sorted(set(wanted).difference(known), key=firebase_key_order)
+    slots = [bisect.bisect_left(known, firebase_key_order(key), key=firebase_key_order) for key in new_keys]
+    keys = np.insert(np.asarray(known, dtype=object), slots, new_keys).tolist() if new_keys else known
+    data = fetch_ranges(path, key_runs(keys, wanted))
+    return {key: value for key, value in data.items() if key in wanted}
+
+# How an incremental sync rebuilt the snapshot's rows: the previous rows that are
+# still current (`kept`, a boolean mask) followed by the fetched `updates` are put
+# in Firebase key order by `order`. Copies derived from the previous frame row by
+# row (the typed company frame, its indexes) are patched the same way instead of
+# being rebuilt: `positions` maps each previous row to its new position (-1 when
+# it was dropped) and `added` holds the new positions of the updates.
+class RowMerge:
+    def __init__(self, kept, updates, order, previous_version=None):
+        self.kept = kept
+        self.updates = updates
+        self.order = order
+        self.previous_version = previous_version
+        rows = np.empty(len(order), dtype=np.int32)
+        rows[order] = np.arange(len(order), dtype=np.int32)
+        kept_count = int(kept.sum())
+        self.positions = np.full(len(kept), -1, dtype=np.int32)
+        self.positions[kept] = rows[:kept_count]
+        self.added = rows[kept_count:]
+
+    @classmethod
+    def plan(cls, frame, updates, removed_keys, previous_version=None):
+        stale_keys = set(removed_keys) | set(updates[KEY_COLUMN])
+        kept = ~frame[KEY_COLUMN].isin(stale_keys).to_numpy()
+        kept_keys = frame[KEY_COLUMN].to_numpy()[kept].tolist()
+        new_keys = updates[KEY_COLUMN].tolist()
+        # Kept rows are in Firebase key order already; each update is inserted at
+        # its place among them rather than sorting the whole frame again
+        new_rows = sorted(range(len(new_keys)), key=lambda row: firebase_key_order(new_keys[row]))
+        slots = [bisect.bisect_left(kept_keys, firebase_key_order(new_keys[row]), key=firebase_key_order) for row in new_rows]
+        order = np.insert(np.arange(len(kept_keys)), slots, len(kept_keys) + np.asarray(new_rows, dtype=np.intp))
+        return cls(kept, updates, order, previous_version)
+
+    # `frame` row-aligned with the previous snapshot, `rows` with the updates
+    def apply(self, frame, rows):
+        # Only removals: nothing to append (concatenating an empty frame can change column types)
+        merged = pd.concat([frame[self.kept], rows], ignore_index=True) if len(rows) else frame[self.kept]
+        return merged.iloc[self.order].reset_index(drop=True)
+
+def sort_records(frame):
+    # Rows in the order a full download returns them: Firebase key order
+    sort_keys = [firebase_key_order(key) for key in frame[KEY_COLUMN]]
+    order = sorted(range(len(frame)), key=sort_keys.__getitem__)
+    return frame.iloc[order].reset_index(drop=True)
+
+# Version string chained from the previous one and what changed since
+def next_version(previous, *parts):
+    digest = hashlib.sha1((previous or "").encode())
+    for part in parts:
+        digest.update(json.dumps(sorted(part) if isinstance(part, set) else part).encode())
+    return digest.hexdigest()[:16]
+
+# Bring the local snapshot of `path` up to date and return it (with KEY_COLUMN)
+# together with its manifest and, after an incremental sync that changed it, the
+# RowMerge that was applied (None otherwise).
+# The records named by the change log since the snapshot's last sync, plus any
+# `changed_keys`/`removed_keys` the caller knows about, are fetched and merged;
+# values the caller already holds can be passed as `records`. Without changes the
+# snapshot is returned as it is on disk.
+def sync_snapshot_merge(path, full=False, changed_keys=(), removed_keys=(), records=None, snapshot_dir=None):
+    frame, manifest = load_snapshot(path, snapshot_dir)
+    now = time.time()
+    if frame is not None and not full:
+        full = now - manifest.get("last_full_sync", 0) > FULL_SYNC_INTERVAL
+
+    if frame is None or full:
+        # Taken before the download, so writes during it are replayed next time
+        marker = latest_change(path)
+        data = fetch_tree(path, refresh_index=True)
+        frame = sort_records(decode_records(data))
+        manifest = {
+            "path": path,
+            "records": len(frame),
+            "last_full_sync": now,
+            "last_sync": now,
+            "marker": marker,
+            "version": next_version(None, list(data.keys()), now),
+            "sorted": True,
+        }
+        save_snapshot(path, frame, manifest, snapshot_dir)
+        logger.info("Full snapshot of %s: %d records", path, len(frame))
+        return frame, manifest, None
+
+    previous_version = manifest.get("version")
+    # Snapshots from before rows were kept in key order are sorted once; copies
+    # derived from their rows cannot follow the merge then
+    if not manifest.get("sorted"):
+        frame = sort_records(frame)
+        manifest["sorted"] = True
+        previous_version = None
+
+    changes = read_changes(path, manifest.get("marker"))
+    local_keys = set(frame[KEY_COLUMN])
+    wanted = (changes.written - set(removed_keys)) | set(changed_keys)
+    removed = ((changes.removed - set(changed_keys)) | set(removed_keys)) & local_keys
+
+    # Nothing changed: the snapshot on disk is current, so it is not rewritten
+    if not wanted and not removed:
+        return frame, manifest, None
+
+    data = {key: records[key] for key in wanted if key in records} if records else {}
+    if len(data) < len(wanted):
+        data.update(fetch_keys(path, frame[KEY_COLUMN].tolist(), wanted - data.keys()))
+    # Announced keys that are gone by now were deleted after the announcement
+    removed |= (wanted - data.keys()) & local_keys
+    updates = decode_records(data)
+    merge = RowMerge.plan(frame, updates, removed, previous_version)
+    frame = merge.apply(frame, updates)
+    manifest["version"] = next_version(manifest.get("version"), wanted, removed)
+    manifest["marker"] = changes.last
+    manifest["records"] = len(frame)
+    manifest["last_sync"] = now
+    save_snapshot(path, frame, manifest, snapshot_dir)
+    logger.info("Synced snapshot of %s: %d fetched, %d removed", path, len(data), len(removed))
+    return frame, manifest, merge
+
+def sync_snapshot(path, full=False, changed_keys=(), removed_keys=(), records=None, snapshot_dir=None):
+    frame, manifest, _ = sync_snapshot_merge(path, full, changed_keys, removed_keys, records, snapshot_dir)
+    return frame, manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync local snapshots of Firebase trees")
+    parser.add_argument("paths", nargs="*", default=["FinalMergedData"])
+    parser.add_argument("--full", action="store_true", help="re-download the whole tree")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for path in args.paths:
+        frame, manifest = sync_snapshot(path, full=args.full)
+        print(f"{path}: {len(frame)} records, version {manifest['version']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from change_log import CHANGE_LOG_NODE
+from filter_engine import FilterEngine
+from firebase_app import STORAGE_BACKEND
+from firebase_loader import KEY_INDEX_NODE, fetch_tree, firebase_key_order
+
+# Embedded SQLite storage. With FAM_STORAGE_BACKEND=sqlite every database reference
+# (see firebase_app.reference) is served from the `nodes` table of one local file,
+# so the app runs offline once the trees are imported:
+#   python storage.py import                 # copy the trees from Firebase
+#   python storage.py import --from-json f   # or from a JSON export/synthetic tree
+# The same file holds indexed query tables for the served company data, built once
+# per dataset version, to which facet filters, search and the company/agent join
+# are pushed down (SQLiteFilterEngine).
+STORAGE_PATH = os.getenv("FAM_STORAGE_PATH", ".cache/fam.sqlite3")
+TREES = ["FinalMergedData", "Zapier_Data", "Agents"]
+# Nodes holding one collection per tree (<node>/<tree>/<key>) rather than records
+PER_TREE_NODES = {KEY_INDEX_NODE, CHANGE_LOG_NODE}
+
+# Company columns loaded into the facet table; other columns are filtered in pandas
+FACET_COLUMNS = [
+    "ID",
+    "company.category.industry",
+    "company.category.sector",
+    "company.geo.country",
+    "company.geo.state",
+    "company.type",
+    "company.metrics.employeesRange",
+]
+TECH_COLUMN = "company.tech"
+TRIGRAM = 3
+
+# (kind, num, key) columns that sort like Firebase orders keys
+def _sort_key(key):
+    kind, number, _ = firebase_key_order(key)
+    return kind, number, key
+
+class SQLiteStore:
+    def __init__(self, path=None):
+        path = path or STORAGE_PATH
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Keys carry their Firebase sort order (integer-like keys first, numerically)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS nodes ("
+            "tree TEXT NOT NULL, key TEXT NOT NULL, kind INTEGER NOT NULL, num INTEGER NOT NULL, "
+            "value TEXT NOT NULL, PRIMARY KEY (tree, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS nodes_order ON nodes (tree, kind, num, key)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS company_tables (generation INTEGER PRIMARY KEY AUTOINCREMENT, version TEXT NOT NULL UNIQUE)")
+        self.full_text = self._has_trigram_tokenizer()
+
+    def _has_trigram_tokenizer(self):
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.trigram_probe USING fts5(a, tokenize='trigram')")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def reference(self, path="/"):
+        return SQLiteReference(self, [part for part in path.strip("/").split("/") if part])
+
+    # Split a path into (collection, key): records are <tree>/<key>, and
+    # <node>/<tree>/<key> under PER_TREE_NODES; key is None for a collection
+    @staticmethod
+    def locate(parts):
+        depth = 3 if parts and parts[0] in PER_TREE_NODES else 2
+        if len(parts) == depth:
+            return "/".join(parts[:-1]), parts[-1]
+        if len(parts) == depth - 1:
+            return "/".join(parts), None
+        raise ValueError(f"SQLite storage serves collections and their records, not {'/'.join(parts)!r}")
+
+    def get(self, tree, key=None, shallow=False, start=None, end=None, first=None, last=None):
+        if key is not None:
+            row = self.query("SELECT value FROM nodes WHERE tree = ? AND key = ?", (tree, key))
+            return json.loads(row[0][0]) if row else None
+        sql, params = f"SELECT {'key' if shallow else 'key, value'} FROM nodes WHERE tree = ?", [tree]
+        if start is not None:
+            sql += " AND (kind, num, key) >= (?, ?, ?)"
+            params.extend(_sort_key(start))
+        if end is not None:
+            sql += " AND (kind, num, key) <= (?, ?, ?)"
+            params.extend(_sort_key(end))
+        if last is not None:
+            # The last rows, read backwards and turned around
+            rows = self.query(sql + " ORDER BY kind DESC, num DESC, key DESC LIMIT ?", [*params, last])[::-1]
+        else:
+            sql += " ORDER BY kind, num, key"
+            if first is not None:
+                sql += " LIMIT ?"
+                params.append(first)
+            rows = self.query(sql, params)
+        if shallow:
+            return {key: True for key, in rows} or None
+        return {key: json.loads(value) for key, value in rows} or None
+
+    # Write `values` ({key: value}, None deletes) into `tree` in one transaction;
+    # with `replace` the tree is cleared first
+    def write(self, tree, values, replace=False):
+        self.write_many({tree: values}, replace)
+
+    # Write {tree: {key: value}} for several collections in one transaction
+    def write_many(self, values_by_tree, replace=False):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for tree, values in values_by_tree.items():
+                    rows = [(tree, *_sort_key(key), json.dumps(value)) for key, value in values.items() if value is not None]
+                    removed = [(tree, key) for key, value in values.items() if value is None]
+                    if replace:
+                        self._db.execute("DELETE FROM nodes WHERE tree = ?", (tree,))
+                    self._db.executemany("INSERT OR REPLACE INTO nodes (tree, kind, num, key, value) VALUES (?, ?, ?, ?, ?)", rows)
+                    self._db.executemany("DELETE FROM nodes WHERE tree = ? AND key = ?", removed)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def tree_sizes(self):
+        return dict(self.query("SELECT tree, COUNT(*) FROM nodes GROUP BY tree"))
+
+    # Build the company query tables for `dataset` unless its version has them
+    # already, and return their generation. Each version gets its own tables
+    # (facet_values_<generation>, ...), so an engine still serving the previous
+    # version keeps working while the next one is built; see drop_company_tables.
+    # Positions are row positions in dataset.frame.
+    def build_company_tables(self, dataset):
+        with self._lock:
+            built = self.query("SELECT generation FROM company_tables WHERE version = ?", (dataset.version,))
+            if built:
+                return built[0][0]
+            frame = dataset.frame
+            facet_rows = []
+            for column in FACET_COLUMNS:
+                if column in frame.columns:
+                    values = frame[column].to_numpy()
+                    facet_rows.extend((column, value, position) for position, value in enumerate(values) if isinstance(value, str))
+            tech_index = dataset.tech_index
+            for tech, postings in tech_index.postings.items():
+                facet_rows.extend((TECH_COLUMN, tech, int(position)) for position in postings)
+            company_keys = list(dataset.sanitized_id_index.items())
+            texts = [
+                (position, name.lower() if isinstance(name, str) else "", domain.lower() if isinstance(domain, str) else "")
+                for position, (name, domain) in enumerate(zip(frame["company.name"].to_numpy(), frame["Domain"].to_numpy()))
+            ]
+            self._db.execute("BEGIN")
+            try:
+                generation = self._db.execute("INSERT INTO company_tables (version) VALUES (?)", (dataset.version,)).lastrowid
+                self._db.execute(f"CREATE TABLE facet_values_{generation} (col TEXT NOT NULL, value TEXT NOT NULL, position INTEGER NOT NULL)")
+                self._db.execute(f"CREATE TABLE company_keys_{generation} (sanitized_id TEXT PRIMARY KEY, position INTEGER NOT NULL)")
+                if self.full_text:
+                    self._db.execute(f"CREATE VIRTUAL TABLE company_text_{generation} USING fts5(name, domain, tokenize='trigram')")
+                    self._db.executemany(f"INSERT INTO company_text_{generation} (rowid, name, domain) VALUES (?, ?, ?)", texts)
+                else:
+                    self._db.execute(f"CREATE TABLE company_text_{generation} (position INTEGER PRIMARY KEY, name TEXT, domain TEXT)")
+                    self._db.executemany(f"INSERT INTO company_text_{generation} VALUES (?, ?, ?)", texts)
+                self._db.executemany(f"INSERT INTO facet_values_{generation} VALUES (?, ?, ?)", facet_rows)
+                self._db.executemany(f"INSERT INTO company_keys_{generation} VALUES (?, ?)", company_keys)
+                self._db.execute(f"CREATE INDEX facet_values_{generation}_lookup ON facet_values_{generation} (col, value, position)")
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            return generation
+
+    # Drop the company query tables of every version not in `keep`. Called once a
+    # new version is served, keeping the one it replaced for requests still using it.
+    def drop_company_tables(self, keep):
+        with self._lock:
+            for generation, version in self.query("SELECT generation, version FROM company_tables"):
+                if version in keep:
+                    continue
+                self._db.execute("BEGIN")
+                try:
+                    for table in ("facet_values", "company_keys", "company_text"):
+                        self._db.execute(f"DROP TABLE IF EXISTS {table}_{generation}")
+                    self._db.execute("DELETE FROM company_tables WHERE generation = ?", (generation,))
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+
+    def facet_positions(self, generation, column, values, match="any"):
+        values = list(values)
+        placeholders = ", ".join("?" * len(values))
+        sql = f"SELECT position FROM facet_values_{generation} WHERE col = ? AND value IN ({placeholders})"
+        if match == "all":
+            sql += " GROUP BY position HAVING COUNT(DISTINCT value) = ?"
+            return [position for position, in self.query(sql, [column, *values, len(set(values))])]
+        return [position for position, in self.query(sql, [column, *values])]
+
+    def search_positions(self, generation, term):
+        term = term.lower()
+        table = f"company_text_{generation}"
+        if self.full_text and len(term) >= TRIGRAM:
+            # The trigram index answers a substring LIKE on one column without a scan,
+            # but not with an ESCAPE clause or under OR, so each column gets its own
+            # plain LIKE. `%` and `_` in the term then match as wildcards, and those
+            # matches are checked against the term here.
+            wildcards = "%" in term or "_" in term
+            columns = "rowid, name, domain" if wildcards else "rowid"
+            rows = self.query(
+                f"SELECT {columns} FROM {table} WHERE name LIKE ? UNION SELECT {columns} FROM {table} WHERE domain LIKE ?",
+                (f"%{term}%", f"%{term}%"),
+            )
+            if wildcards:
+                return [position for position, name, domain in rows if term in name or term in domain]
+            return [position for position, in rows]
+        key = "rowid" if self.full_text else "position"
+        sql = f"SELECT {key} FROM {table} WHERE instr(name, ?) > 0 OR instr(domain, ?) > 0"
+        return [position for position, in self.query(sql, (term, term))]
+
+    # Positions and keys of companies that have an Agents/ entry, in row order
+    def agent_positions(self, generation):
+        return self.query(
+            f"SELECT k.position, k.sanitized_id FROM company_keys_{generation} k "
+            "JOIN nodes n ON n.tree = 'Agents' AND n.key = k.sanitized_id ORDER BY k.position"
+        )
+
+class SQLiteReference:
+    def __init__(self, store, parts, ordered=False, start=None, end=None, first=None, last=None):
+        self._store = store
+        self._parts = parts
+        self._ordered = ordered
+        self._start = start
+        self._end = end
+        self._first = first
+        self._last = last
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    def child(self, path):
+        return SQLiteReference(self._store, self._parts + [part for part in path.strip("/").split("/") if part])
+
+    def _query(self, **changes):
+        options = dict(ordered=self._ordered, start=self._start, end=self._end, first=self._first, last=self._last)
+        options.update(changes)
+        return SQLiteReference(self._store, self._parts, **options)
+
+    def order_by_key(self):
+        return self._query(ordered=True)
+
+    def start_at(self, start):
+        return self._query(start=start)
+
+    def end_at(self, end):
+        return self._query(end=end)
+
+    def limit_to_first(self, limit):
+        return self._query(first=limit)
+
+    def limit_to_last(self, limit):
+        return self._query(last=limit)
+
+    def get(self, shallow=False):
+        tree, key = self._store.locate(self._parts)
+        return self._store.get(tree, key, shallow, self._start, self._end, self._first, self._last)
+
+    def set(self, value):
+        tree, key = self._store.locate(self._parts)
+        if key is None:
+            self._store.write(tree, value or {}, replace=True)
+        else:
+            self._store.write(tree, {key: value})
+
+    # Multi-path update; every path has to end at a record
+    def update(self, values):
+        values_by_tree = {}
+        for path, value in values.items():
+            tree, key = self._store.locate(self._parts + [part for part in path.strip("/").split("/") if part])
+            if key is None:
+                raise ValueError(f"update() writes records, not the collection {tree!r}")
+            values_by_tree.setdefault(tree, {})[key] = value
+        self._store.write_many(values_by_tree)
+
+    def delete(self):
+        self.set(None)
+
+    # Child under a new key that sorts after earlier pushes from any process
+    def push(self, value):
+        child = self.child(f"-{time.time_ns():019d}{os.getpid():07d}")
+        child.set(value)
+        return child
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteStore()
+    return _store
+
+# Filter engine that answers facet, technology and search filters from the query
+# tables instead of scanning the frame; masks are cached like FilterEngine's
+class SQLiteFilterEngine(FilterEngine):
+    def __init__(self, dataset, store=None, cache_size=None):
+        super().__init__(dataset, cache_size)
+        self._store = store or get_store()
+        self._generation = self._store.build_company_tables(dataset)
+
+    def _mask_of(self, positions):
+        mask = np.zeros(self._size, dtype=bool)
+        mask[np.asarray(positions, dtype=np.intp)] = True
+        return mask
+
+    def _isin_mask(self, column, values):
+        if column not in FACET_COLUMNS:
+            return super()._isin_mask(column, values)
+        return self._mask_of(self._store.facet_positions(self._generation, column, values))
+
+    def _tech_mask(self, technologies, match):
+        return self._mask_of(self._store.facet_positions(self._generation, TECH_COLUMN, technologies, match))
+
+    def _search_mask(self, term):
+        return self._mask_of(self._store.search_positions(self._generation, term))
+
+    def agents_for(self, mask, agent_table):
+        return self._collect_agents([(p, key) for p, key in self._store.agent_positions(self._generation) if mask[p]], agent_table)
+
+# Filter engine for a dataset under the configured storage backend
+def filter_engine(dataset):
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteFilterEngine(dataset)
+    return FilterEngine(dataset)
+
+# Drop the query tables of versions other than those in `keep` under the configured
+# storage backend (the other backend keeps its masks with the dataset)
+def retire_company_tables(keep):
+    if STORAGE_BACKEND == "sqlite":
+        get_store().drop_company_tables(keep)
+
+def import_trees(trees, source=None):
+    store = get_store()
+    dump = None
+    if source:
+        with open(source) as f:
+            dump = json.load(f)
+    for tree in trees:
+        values = dump.get(tree, {}) if dump is not None else fetch_tree(tree)
+        store.write(tree, values, replace=True)
+        print(f"{tree}: {len(values)} records")
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the embedded SQLite storage")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    importer = subcommands.add_parser("import", help="copy trees into the local database")
+    importer.add_argument("trees", nargs="*", default=TREES)
+    importer.add_argument("--from-json", default=None, help="JSON export (or synthetic_data.py output) instead of Firebase")
+    subcommands.add_parser("stats", help="records per tree")
+    args = parser.parse_args()
+    if args.command == "import":
+        if STORAGE_BACKEND == "sqlite" and not args.from_json:
+            parser.error("importing from Firebase needs FAM_STORAGE_BACKEND unset")
+        import_trees(args.trees, args.from_json)
+    else:
+        print(json.dumps(get_store().tree_sizes(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import json
+
+import numpy as np
+
+from firebase_app import sanitize_id
+
+# Synthetic FinalMergedData, Zapier_Data and Agents trees shaped like the real
+# ones: records are JSON strings under integer-like keys (Agents under sanitized
+# company IDs), numeric fields have missing values, and company.tech lists follow
+# a long-tailed popularity curve. The same `n` and `seed` give the same trees.
+INDUSTRIES = {
+    "Information Technology": ["Software", "IT Services", "Internet Software & Services"],
+    "Consumer Discretionary": ["Retail", "Media", "Hotels, Restaurants & Leisure"],
+    "Financials": ["Banks", "Insurance", "Diversified Financial Services"],
+    "Health Care": ["Health Care Providers & Services", "Biotechnology", "Pharmaceuticals"],
+    "Industrials": ["Professional Services", "Machinery", "Construction & Engineering"],
+}
+COUNTRIES = {
+    "United States": ("US", ["California", "New York", "Texas", "Washington"]),
+    "United Kingdom": ("GB", ["England", "Scotland"]),
+    "Germany": ("DE", ["Berlin", "Bavaria"]),
+    "France": ("FR", ["Île-de-France"]),
+    "Israel": ("IL", ["Tel Aviv District", "Central District"]),
+    "India": ("IN", ["Karnataka", "Maharashtra"]),
+    "Canada": ("CA", ["Ontario", "British Columbia"]),
+}
+COMPANY_TYPES = ["private", "public", "education", "nonprofit"]
+EMPLOYEE_RANGES = [(1, 10, "1-10"), (11, 50, "11-50"), (51, 250, "51-250"), (251, 1000, "251-1K"), (1001, 50000, "1K-5K")]
+COMMON_TECH = [
+    "google_analytics", "google_tag_manager", "facebook_pixel", "hubspot", "salesforce", "stripe",
+    "intercom", "zendesk", "segment", "hotjar", "mailchimp", "shopify", "wordpress", "cloudflare",
+    "amazon_web_services", "google_cloud", "microsoft_azure", "slack", "zoom", "atlassian_jira",
+    "github", "sentry", "new_relic", "datadog", "optimizely", "marketo", "pardot", "drift",
+    "typeform", "calendly", "twilio", "sendgrid", "auth0", "okta", "recurly", "chargebee",
+]
+TECH_VOCABULARY = 2000
+MISSING_RATE = 0.1
+
+def technologies(size=TECH_VOCABULARY):
+    return COMMON_TECH + [f"tech_{i:04d}" for i in range(size - len(COMMON_TECH))]
+
+def _tech_lists(rng, n, vocabulary):
+    # Zipf-like popularity; 5 to ~80 technologies per company, a few with none
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 1.1
+    counts = np.clip(rng.lognormal(3.0, 0.6, n).astype(int), 5, 80)
+    counts[rng.random(n) < 0.05] = 0
+    draws = rng.choice(len(vocabulary), size=int(counts.sum()), p=weights / weights.sum())
+    tech_lists, start = [], 0
+    for count in counts:
+        picked = dict.fromkeys(draws[start:start + count].tolist())
+        tech_lists.append(", ".join(vocabulary[i] for i in picked) if picked else None)
+        start += count
+    return tech_lists
+
+def _with_missing(rng, values):
+    return np.where(rng.random(len(values)) < MISSING_RATE, np.nan, values).tolist()
+
+def company_id(i):
+    return f"company{i}.example.com"
+
+def generate_companies(n, seed=0):
+    rng = np.random.default_rng(seed)
+    tech_lists = _tech_lists(rng, n, technologies())
+    sectors = list(INDUSTRIES)
+    countries = list(COUNTRIES)
+    # All random fields are drawn up front, the loop only assembles records
+    sector_choice = rng.integers(len(sectors), size=n)
+    industry_choice = rng.integers(3, size=n)
+    country_choice = rng.integers(len(countries), size=n)
+    state_choice = rng.integers(1000, size=n)
+    type_choice = rng.integers(len(COMPANY_TYPES), size=n)
+    range_choice = rng.integers(len(EMPLOYEE_RANGES), size=n)
+    lows = np.array([low for low, _, _ in EMPLOYEE_RANGES])[range_choice]
+    highs = np.array([high for _, high, _ in EMPLOYEE_RANGES])[range_choice]
+    employees = _with_missing(rng, np.floor(lows + rng.random(n) * (highs - lows + 1)))
+    founded = _with_missing(rng, rng.integers(1950, 2024, size=n).astype(float))
+    has_logo = rng.random(n) > MISSING_RATE
+    records = {}
+    for i in range(n):
+        domain = company_id(i)
+        sector = sectors[sector_choice[i]]
+        industry = INDUSTRIES[sector][industry_choice[i]]
+        country = countries[country_choice[i]]
+        country_code, states = COUNTRIES[country]
+        state = states[state_choice[i] % len(states)]
+        records[str(i)] = json.dumps({
+            "ID": domain,
+            "Domain": domain,
+            "company.name": f"Company {i}",
+            "company.description": f"Company {i} builds {industry.lower()} products for customers in {country}.",
+            "company.logo": f"https://logo.example.com/{domain}" if has_logo[i] else None,
+            "company.category.sector": sector,
+            "company.category.industryGroup": sector,
+            "company.category.industry": industry,
+            "company.category.subIndustry": industry,
+            "company.geo.country": country,
+            "company.geo.countryCode": country_code,
+            "company.geo.state": state,
+            "company.geo.city": state,
+            "company.location": f"{state}, {country}",
+            "company.type": COMPANY_TYPES[type_choice[i]],
+            "company.metrics.employees": employees[i],
+            "company.metrics.employeesRange": EMPLOYEE_RANGES[range_choice[i]][2],
+            "company.foundedYear": founded[i],
+            "company.tech": tech_lists[i],
+        })
+    return records
+
+# APIs for every third company, 1-12 each
+def generate_zapier(n, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    records, key = {}, 0
+    for i in range(0, n, 3):
+        for j in range(int(rng.integers(1, 13))):
+            records[str(key)] = json.dumps({
+                "ID": company_id(i),
+                "API Name": f"Company {i} API {j}",
+                "API Type": "Trigger" if rng.random() < 0.5 else "Action",
+                "Descroption": f"Company {i} connects its products to other apps.",
+            })
+            key += 1
+    return records
+
+# Agents for a quarter of the companies, 3-8 each, stored as the app writes them
+def generate_agents(n, seed=0):
+    rng = np.random.default_rng(seed + 2)
+    agents = {}
+    for i in range(0, n, 4):
+        agents[sanitize_id(company_id(i))] = json.dumps({"agents": [
+            {
+                "Title": f"Company {i} agent {j}",
+                "AgentDescription": f"Automates workflow {j} for Company {i} customers.",
+                "UsedBy": ["Operations", "Sales"][: int(rng.integers(1, 3))],
+                "RelatedAPIs": [f"Company {i} API {k}" for k in range(int(rng.integers(0, 3)))],
+            }
+            for j in range(int(rng.integers(3, 9)))
+        ]})
+    return agents
+
+def generate_tree(n, seed=0):
+    return {
+        "FinalMergedData": generate_companies(n, seed),
+        "Zapier_Data": generate_zapier(n, seed),
+        "Agents": generate_agents(n, seed),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic database tree as JSON")
+    parser.add_argument("companies", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, "w") as f:
+        json.dump(generate_tree(args.companies, args.seed), f)
+
+if __name__ == "__main__":
+    main()
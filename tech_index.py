@@ -0,0 +1,63 @@
+import copy
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from postings import add_postings, remap_postings
+
+# Inverted index from technology name to the sorted row positions of the companies
+# using it, built once from the comma-separated `company.tech` column. Filtering on
+# technologies becomes a union ("any") or intersection ("all") of position arrays.
+class TechIndex:
+    def __init__(self, tech_series, separator=', '):
+        self.size = len(tech_series)
+        self.separator = separator
+        exploded = tech_series.reset_index(drop=True).str.split(separator).explode()
+        exploded = exploded[exploded.notna() & (exploded != '')]
+        pairs = pd.DataFrame({'position': exploded.index, 'tech': exploded.to_numpy()}).drop_duplicates()
+        codes, technologies = pd.factorize(pairs['tech'])
+        positions = pairs['position'].to_numpy(dtype=np.int32)
+        # Stable sort by tech keeps each posting list in ascending row order
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(technologies)))[:-1]
+        # Technologies in order of first appearance, like Series.unique()
+        self.technologies = technologies.tolist()
+        self.postings = dict(zip(self.technologies, np.split(positions[order], bounds)))
+
+    # This index for the frame a snapshots.RowMerge produced, given its technology
+    # column: postings move with their rows and only the merged-in rows are split
+    def patched(self, merge, tech_series):
+        tech_series = tech_series.reset_index(drop=True)
+        added = TechIndex(tech_series.iloc[merge.added], self.separator)
+        index = copy.copy(self)
+        index.size = len(tech_series)
+        index.postings = add_postings(
+            remap_postings(self.postings, merge.positions),
+            {tech: merge.added[rows] for tech, rows in added.postings.items()},
+        )
+        # Order of first appearance: by first row, then by place within that row
+        values = tech_series.to_numpy()
+        def first_appearance(tech):
+            row = int(index.postings[tech][0])
+            return row, values[row].split(self.separator).index(tech)
+        index.technologies = sorted(index.postings, key=first_appearance)
+        return index
+
+    def count(self, tech):
+        return len(self.postings.get(tech, ()))
+
+    def positions(self, technologies, match='any'):
+        postings = [self.postings.get(tech, np.empty(0, dtype=np.int32)) for tech in technologies]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        if match == 'all':
+            # Intersect starting from the rarest technology to keep arrays small
+            postings.sort(key=len)
+            return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), postings)
+        return np.unique(np.concatenate(postings))
+
+    def mask(self, technologies, match='any'):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.positions(technologies, match)] = True
+        return mask
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Settings are read from the environment when the modules are imported: keep every
+# local file in a scratch directory, turn the response cache off (so each test
+# sees every request) and use the in-memory database rather than SQLite
+_scratch = tempfile.mkdtemp(prefix="fam-tests-")
+os.environ.update({
+    "FAM_SNAPSHOT_DIR": os.path.join(_scratch, "snapshots"),
+    "FAM_LOCK_DIR": os.path.join(_scratch, "locks"),
+    "FAM_RESPONSE_CACHE_PATH": "",
+    "ANTHROPIC_API_KEY": "test-key",
+})
+for name in ("FAM_STORAGE_BACKEND", "FAM_METRICS_PATH", "FAM_TRACE_LOG_PATH", "ANTHROPIC_API_URL"):
+    os.environ.pop(name, None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local stand-in for the messages API and any other HTTP endpoint. Every request is
+# recorded with the client port, so tests can tell whether a connection was reused.
+#   /v1/messages  answers with agents for the company named in the prompt
+#   /slow         answers after `delay` seconds
+#   anything else answers {"ok": true}
+# A path listed in `failures` is answered with 529 and `retry_after` that many times first.
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(None)
+
+    def do_POST(self):
+        self._handle(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+
+    def _handle(self, body):
+        server = self.server
+        with server.lock:
+            server.calls.append((self.path, self.client_address[1], body))
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        if failures:
+            self._reply(529, {"error": "overloaded"}, {"Retry-After": server.retry_after})
+        elif self.path == "/v1/messages":
+            name = body["messages"][0]["content"].split("Company: ")[1].split("\n")[0]
+            agents = [{"Title": f"{name} assistant", "AgentDescription": "Answers questions", "UsedBy": ["Support"], "RelatedAPIs": []}]
+            self._reply(200, {"content": [{"text": json.dumps({"agents": agents})}]})
+        else:
+            if self.path == "/slow":
+                time.sleep(server.delay)
+            self._reply(200, {"ok": True})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.failures = {}
+        self.retry_after = "0"
+        self.delay = 0.0
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    # Names of the companies ideation was requested for, in request order
+    def companies(self):
+        with self.lock:
+            return [
+                body["messages"][0]["content"].split("Company: ")[1].split("\n")[0]
+                for path, _, body in self.calls if path == "/v1/messages"
+            ]
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# A synthetic tree of 40 companies served by the in-memory database, with the
+# snapshots of this test only and nothing loaded yet
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    import snapshots
+    from data_store import reset_data
+    from fake_firebase import FakeDatabase
+    from synthetic_data import generate_tree
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    database = FakeDatabase(generate_tree(40)).install()
+    reset_data()
+    yield database
+    reset_data()
+    database.uninstall()
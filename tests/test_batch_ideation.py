@@ -0,0 +1,39 @@
+import pytest
+
+import batch_ideation
+from agent_store import fetch_agents_data
+from data_store import load_company_dataset, reset_data
+from firebase_app import sanitize_id
+
+def test_resumes_where_an_interrupted_run_stopped(database, stub_server, tmp_path, monkeypatch):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    api_url = stub_server.url("/v1/messages")
+    dataset = load_company_dataset()
+    missing = batch_ideation.pending_companies(dataset, fetch_agents_data(), {"done": [], "failed": {}})
+    names = {dataset.row(company_id)["company.name"]: company_id for company_id in missing}
+    assert len(missing) == 30
+
+    # The process is killed right after the first batch is checkpointed
+    save_checkpoint = batch_ideation.save_checkpoint
+    def save_and_die(path, checkpoint):
+        save_checkpoint(path, checkpoint)
+        raise KeyboardInterrupt
+    monkeypatch.setattr(batch_ideation, "save_checkpoint", save_and_die)
+    with pytest.raises(KeyboardInterrupt):
+        batch_ideation.run(concurrency=2, backoff=0.01, batch_size=5, checkpoint_path=checkpoint_path, api_url=api_url)
+    finished = batch_ideation.load_checkpoint(checkpoint_path)["done"]
+    assert len(finished) == 5
+    assert all(database.tree["Agents"].get(sanitize_id(company_id)) for company_id in finished)
+
+    # A new process resumes: only the unfinished companies are requested, once each
+    monkeypatch.setattr(batch_ideation, "save_checkpoint", save_checkpoint)
+    reset_data()
+    stub_server.calls.clear()
+    checkpoint = batch_ideation.run(concurrency=2, backoff=0.01, batch_size=5, checkpoint_path=checkpoint_path, api_url=api_url)
+    requested = [names[name] for name in stub_server.companies()]
+    assert sorted(requested) == sorted(set(missing) - set(finished))
+    assert sorted(checkpoint["done"]) == sorted(missing)
+    assert checkpoint["failed"] == {}
+    agents = fetch_agents_data()
+    for company_id in missing:
+        assert agents.agents(sanitize_id(company_id))[0]["Title"] == f"{dataset.row(company_id)['company.name']} assistant"
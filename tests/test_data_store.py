@@ -0,0 +1,78 @@
+import json
+
+import pandas as pd
+
+import data_store
+from change_log import record_changes
+from company_schema import apply_schema
+from data_store import CompanyDataset, company_data, fetch_zapier_data, load_company_dataset, zapier_data
+from snapshots import load_snapshot, records_frame
+from zapier_index import ZapierIndex
+
+def _current(path):
+    snapshot, manifest = load_snapshot(path)
+    return records_frame(snapshot), manifest["version"]
+
+def _edit(tree, key, **fields):
+    record = json.loads(tree[key])
+    record.update(fields)
+    tree[key] = json.dumps(record)
+
+# Parquet gives missing text back as None where decoding the records can give NaN
+def _missing_as_nan(frame):
+    return frame.where(frame.notna())
+
+def _postings(index):
+    return {term: positions.tolist() for term, positions in index.postings.items()}
+
+def _rebuilt(*args):
+    raise AssertionError("index built from scratch")
+
+def test_a_delta_patches_the_dataset_like_a_rebuild(database, monkeypatch):
+    dataset = load_company_dataset()
+    companies = database.tree["FinalMergedData"]
+    _edit(companies, "3", **{"company.name": "Renamed Co", "company.tech": "brand_new_tech, stripe", "company.geo.country": "Narnia"})
+    del companies["7"]
+    # A new company between existing keys, and a second row for an existing ID
+    companies["12a"] = json.dumps({"ID": "new.example.com", "company.name": "New Co", "Domain": "new.example.com",
+                                   "company.tech": "stripe", "company.metrics.employees": 12})
+    companies["1"] = json.dumps({"ID": "company5.example.com", "company.name": "Company 5 again"})
+    record_changes("FinalMergedData", ["3", "12a", "1"], ["7"])
+    # The indexes the served dataset has built are patched, not built again
+    with monkeypatch.context() as patch:
+        patch.setattr(data_store, "TechIndex", _rebuilt)
+        patch.setattr(data_store, "SearchIndex", _rebuilt)
+        company_data.force_refresh()
+    patched = load_company_dataset()
+    assert patched.version != dataset.version
+
+    frame, version = _current("FinalMergedData")
+    expected = CompanyDataset(apply_schema(frame)[0], version)
+    assert patched.version == expected.version
+    pd.testing.assert_frame_equal(_missing_as_nan(patched.frame), _missing_as_nan(expected.frame), check_categorical=False)
+    assert patched.id_index == expected.id_index
+    assert patched.sanitized_id_index == expected.sanitized_id_index
+    assert patched.tech_index.technologies == expected.tech_index.technologies
+    assert _postings(patched.tech_index) == _postings(expected.tech_index)
+    assert patched.search_index.texts == expected.search_index.texts
+    assert _postings(patched.search_index) == _postings(expected.search_index)
+    assert patched.facets["company.geo.country"].counts == expected.facets["company.geo.country"].counts
+
+def test_a_delta_patches_the_zapier_index_like_a_rebuild(database):
+    zapier = fetch_zapier_data()
+    apis = database.tree["Zapier_Data"]
+    _edit(apis, "0", **{"API Name": "Renamed API"})
+    _edit(apis, "1", ID="company3.example.com")
+    del apis["2"]
+    apis["9000"] = json.dumps({"ID": "new.example.com", "API Name": "New API", "API Type": "Trigger"})
+    record_changes("Zapier_Data", ["0", "1", "9000"], ["2"])
+    zapier_data.force_refresh()
+    patched = fetch_zapier_data()
+    assert patched.version != zapier.version
+
+    frame, version = _current("Zapier_Data")
+    expected = ZapierIndex(frame, version)
+    assert patched.offsets.keys() == expected.offsets.keys()
+    for company_id in expected.offsets:
+        assert patched.rows(company_id).reset_index(drop=True).equals(expected.rows(company_id).reset_index(drop=True))
+        assert patched.apis(company_id) == expected.apis(company_id)
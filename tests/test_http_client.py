@@ -0,0 +1,57 @@
+import time
+
+import pytest
+import requests
+
+import http_client
+from tracing import LatencyMetrics
+
+@pytest.fixture(autouse=True)
+def client(monkeypatch):
+    # A session and latency metrics of this test's own
+    monkeypatch.setattr(http_client, "_session", None)
+    monkeypatch.setattr(http_client, "metrics", LatencyMetrics())
+
+def test_keeps_the_connection_alive(stub_server):
+    for _ in range(3):
+        assert http_client.request("GET", stub_server.url("/ok")).status_code == 200
+    assert len(stub_server.calls) == 3
+    assert len({port for _, port, _ in stub_server.calls}) == 1
+
+def test_read_timeout(stub_server):
+    stub_server.delay = 2.0
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        http_client.request("GET", stub_server.url("/slow"), timeout=(1, 0.2), retries=0)
+    assert time.perf_counter() - start < 1.5
+
+def test_retries_overloaded_responses_after_retry_after(stub_server):
+    stub_server.failures["/v1/messages"] = 2
+    stub_server.retry_after = "0.2"
+    start = time.perf_counter()
+    response = http_client.post_json(stub_server.url("/v1/messages"), {"messages": [{"content": "Company: Acme\n"}]}, retries=3)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert response.json()["content"][0]["text"]
+    assert len(stub_server.calls) == 3
+    # Both retries waited for Retry-After rather than the jittered backoff
+    assert elapsed >= 0.4
+
+def test_returns_the_last_response_when_retries_run_out(stub_server):
+    stub_server.failures["/ok"] = 10
+    response = http_client.request("GET", stub_server.url("/ok"), retries=2)
+    assert response.status_code == 529
+    assert len(stub_server.calls) == 3
+
+def test_records_latency_metrics(stub_server):
+    stub_server.failures["/ok"] = 1
+    stub_server.delay = 0.3
+    assert http_client.request("GET", stub_server.url("/ok"), metric="stub.ok").status_code == 200
+    http_client.request("GET", stub_server.url("/slow"), metric="stub.slow")
+    with pytest.raises(requests.Timeout):
+        http_client.request("GET", stub_server.url("/slow"), metric="stub.slow", timeout=(1, 0.05), retries=0)
+    summary = http_client.metrics.summary()
+    assert (summary["stub.ok"]["calls"], summary["stub.ok"]["errors"]) == (2, 1)
+    assert (summary["stub.slow"]["calls"], summary["stub.slow"]["errors"]) == (2, 1)
+    assert summary["stub.slow"]["max"] >= 0.3
+    assert summary["stub.slow"]["p50"] <= summary["stub.slow"]["p95"] <= summary["stub.slow"]["max"]
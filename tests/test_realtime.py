@@ -0,0 +1,34 @@
+import json
+import time
+
+import pytest
+
+from change_log import record_changes
+from data_store import company_data, load_company_dataset
+from firebase_app import reference
+from realtime import start_listeners, stop_listeners
+
+@pytest.fixture
+def listeners(database):
+    load_company_dataset()
+    yield start_listeners(batch_seconds=0.05)
+    stop_listeners()
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_large_trees_are_followed_through_their_change_log(database, listeners, monkeypatch):
+    assert sorted(listener.path for listener in listeners) == ["Agents", "Versions/FinalMergedData", "Versions/Zapier_Data"]
+    dataset = load_company_dataset()
+    # A pushed entry is applied without a check reading the log
+    monkeypatch.setattr(company_data.tracker, "check", lambda: pytest.fail("checked the change log"))
+    reference("FinalMergedData/1000").set(json.dumps({"ID": "new.example.com", "company.name": "New Co"}))
+    reference("FinalMergedData/5").delete()
+    record_changes("FinalMergedData", ["1000"], ["5"])
+    _wait_for(lambda: load_company_dataset() is not dataset)
+    dataset = load_company_dataset()
+    assert dataset.row("new.example.com")["company.name"] == "New Co"
+    assert dataset.row("company5.example.com") is None
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from data_store import CompanyDataset
+from filter_engine import FilterEngine
+from snapshots import decode_records, records_frame
+from storage import SQLiteFilterEngine, SQLiteStore
+from synthetic_data import generate_companies
+
+TERMS = [
+    "c", "7", ".", "%", "_",
+    "co", "12", "y ", "A_", "é",
+    "com", "ANY", "1.e", "%2", "x_y",
+    "company 1", "Company 12", "example.com", "company120.example", "ACME_Co", "100% pure", "no such company",
+]
+
+@pytest.fixture(scope="module")
+def dataset():
+    frame = records_frame(decode_records(generate_companies(300)))
+    # Missing values, mixed case, non-ASCII and LIKE wildcards in the data itself
+    frame.loc[3, "company.name"] = None
+    frame.loc[4, "Domain"] = None
+    frame.loc[5, ["company.name", "Domain"]] = ["ACME_Co", "acme_co.example.com"]
+    frame.loc[6, ["company.name", "Domain"]] = ["AcmeXCo", "acmexco.example.com"]
+    frame.loc[7, ["company.name", "Domain"]] = ["100% Pure Café", "pure.example.com"]
+    frame.loc[8, ["company.name", "Domain"]] = ["1000 Pure", "x_y.example.com"]
+    return CompanyDataset(frame, "test")
+
+def _expected(frame, term):
+    return np.flatnonzero(
+        frame["company.name"].str.contains(term, case=False, regex=False, na=False).to_numpy()
+        | frame["Domain"].str.contains(term, case=False, regex=False, na=False).to_numpy()
+    )
+
+@pytest.fixture(params=["memory", "sqlite", "sqlite-without-full-text"])
+def engine(request, dataset, tmp_path):
+    if request.param == "memory":
+        return FilterEngine(dataset)
+    store = SQLiteStore(str(tmp_path / "store.sqlite3"))
+    if request.param == "sqlite-without-full-text":
+        store.full_text = False
+    return SQLiteFilterEngine(dataset, store)
+
+@pytest.mark.parametrize("term", TERMS)
+def test_search_matches_substring_search(dataset, engine, term):
+    assert np.flatnonzero(engine.mask(search=term)).tolist() == _expected(dataset.frame, term).tolist()
+
+def test_search_combines_with_filters(dataset, engine):
+    country = dataset.frame["company.geo.country"].dropna().iloc[0]
+    mask = engine.mask(isin={"company.geo.country": [country]}, search="company 1")
+    expected = np.zeros(len(dataset.frame), dtype=bool)
+    expected[_expected(dataset.frame, "company 1")] = True
+    expected &= (dataset.frame["company.geo.country"] == country).to_numpy()
+    assert np.flatnonzero(mask).tolist() == np.flatnonzero(expected).tolist()
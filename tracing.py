@@ -0,0 +1,156 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from atomic_files import atomic_write
+
+# Lightweight timing of the hot paths. Each span records its duration in the
+# process-wide `metrics` (p50/p95 per name) and, during a script run, in that run's
+# Trace so it can be shown in the debug panel. Finished traces are appended as JSON
+# lines to FAM_TRACE_LOG_PATH and the metrics written in Prometheus text format to
+# FAM_METRICS_PATH (e.g. for a node_exporter textfile collector), when set.
+TRACE_LOG_PATH = os.getenv("FAM_TRACE_LOG_PATH")
+METRICS_PATH = os.getenv("FAM_METRICS_PATH")
+METRICS_PREFIX = "fam"
+
+# Recent call latencies per metric name, for p50/p95 reporting
+class LatencyMetrics:
+    def __init__(self, window=1000):
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self._window)).append(seconds)
+            calls, errors = self._counts.get(name, (0, 0))
+            self._counts[name] = (calls + 1, errors + (not ok))
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+        summary = {}
+        for name, samples in snapshot.items():
+            calls, errors = counts[name]
+            summary[name] = {
+                "calls": calls,
+                "errors": errors,
+                "p50": samples[len(samples) // 2],
+                "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                "max": samples[-1],
+            }
+        return summary
+
+metrics = LatencyMetrics()
+
+# Spans of one script run, in the order they finished
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._depth = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": None if self.duration is None else self.duration * 1000,
+            "spans": self.spans,
+        }
+
+_current_trace = contextvars.ContextVar("fam_trace", default=None)
+
+def current_trace():
+    return _current_trace.get()
+
+def start_trace(name):
+    trace = Trace(name)
+    _current_trace.set(trace)
+    return trace
+
+def finish_trace(trace):
+    trace.finish()
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+    metrics.record(f"run.{trace.name}", trace.duration, ok=True)
+    if TRACE_LOG_PATH:
+        with open(TRACE_LOG_PATH, "a") as f:
+            f.write(json.dumps(trace.to_dict()) + "\n")
+    if METRICS_PATH:
+        write_prometheus(METRICS_PATH)
+    return trace
+
+@contextmanager
+def span(name):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace._depth += 1
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.record(name, seconds, ok)
+        if trace is not None:
+            trace._depth -= 1
+            trace.spans.append({
+                "name": name,
+                "depth": trace._depth,
+                "offset_ms": (start - trace._start) * 1000,
+                "duration_ms": seconds * 1000,
+                "ok": ok,
+            })
+
+# Decorator form of span(); the span is named after the function by default
+def traced(name=None):
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _metric_label(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+def prometheus_text():
+    lines = [
+        f"# HELP {METRICS_PREFIX}_span_seconds Duration of traced operations over recent calls",
+        f"# TYPE {METRICS_PREFIX}_span_seconds summary",
+    ]
+    summary = metrics.summary()
+    for name, stats in sorted(summary.items()):
+        label = _metric_label(name)
+        lines.append(f'{METRICS_PREFIX}_span_seconds{{span="{label}",quantile="0.5"}} {stats["p50"]:.6f}')
+        lines.append(f'{METRICS_PREFIX}_span_seconds{{span="{label}",quantile="0.95"}} {stats["p95"]:.6f}')
+        lines.append(f'{METRICS_PREFIX}_span_seconds_count{{span="{label}"}} {stats["calls"]}')
+    lines.append(f"# TYPE {METRICS_PREFIX}_span_errors_total counter")
+    for name, stats in sorted(summary.items()):
+        lines.append(f'{METRICS_PREFIX}_span_errors_total{{span="{_metric_label(name)}"}} {stats["errors"]}')
+    return "\n".join(lines) + "\n"
+
+# Replaced atomically, so a scraper never sees a partial file
+def write_prometheus(path):
+    text = prometheus_text()
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            f.write(text)
+    atomic_write(path, write)
@@ -0,0 +1,32 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+from data_store import data_versions, warmup
+
+# Start the app with its data already loaded: every tree is read (or taken from the
+# local copies when Firebase fails) and the indexes are built, then the Streamlit
+# server is started in this same process, so the first session is served from
+# memory. Arguments not listed here go to `streamlit run`, e.g.
+#   python warmup.py --server.port 8080
+# With --no-serve it only brings the local copies up to date, e.g. in a deploy step.
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload the data, then start the app")
+    parser.add_argument("--no-serve", action="store_true", help="only preload and update the local copies")
+    args, streamlit_args = parser.parse_known_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    warmup()
+    print(f"Data loaded in {time.perf_counter() - start:.1f}s: {data_versions()}")
+    if args.no_serve:
+        return
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", APP_PATH, *streamlit_args]
+    sys.exit(cli.main())
+
+if __name__ == "__main__":
+    main()
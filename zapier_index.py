@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Zapier rows grouped by company ID. The frame is sorted by ID once so each
+# company's APIs are a contiguous (start, stop) slice, and the columns the UI and
+# prompt need are kept as plain arrays, so a lookup is a dict hit plus a slice.
+class ZapierIndex:
+    def __init__(self, frame, version=None):
+        self.version = version
+        frame = frame.reset_index(drop=True)
+        order, self.offsets = self._grouped(frame)
+        self.frame = frame.iloc[order].reset_index(drop=True)
+        # Row of `frame` each row came from, so patched() can follow a RowMerge
+        self._rows = order
+        self._columns()
+
+    # Row order grouping `frame` by ID and each company's (start, stop) in it,
+    # counted from `base`
+    @staticmethod
+    def _grouped(frame, base=0):
+        if 'ID' in frame.columns:
+            codes, ids = pd.factorize(frame['ID'])
+        else:
+            codes, ids = np.empty(0, dtype=np.intp), []
+        # Rows without an ID get code -1 and sort first; they are never looked up
+        order = np.argsort(codes, kind='stable')
+        stops = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(ids)))
+        starts = stops - np.bincount(codes[codes >= 0], minlength=len(ids))
+        offset = base + int((codes < 0).sum())
+        offsets = {company_id: (int(start) + offset, int(stop) + offset) for company_id, start, stop in zip(ids, starts, stops)}
+        return order, offsets
+
+    def _columns(self):
+        self._api_names = self._column('API Name')
+        self._api_types = self._column('API Type')
+        self._descriptions = self._column('Descroption')  # Note the typo in the original column name
+
+    # This index for the frame a snapshots.RowMerge produced (`frame`, in snapshot
+    # order). Companies none of whose rows left or arrived keep their slices,
+    # moved up past the rows that left; the others are grouped again at the end.
+    def patched(self, merge, frame, version=None):
+        frame = frame.reset_index(drop=True)
+        if 'ID' not in frame.columns or 'ID' not in self.frame.columns:
+            return ZapierIndex(frame, version)
+        ids = self.frame['ID']
+        moved = merge.positions[self._rows]
+        affected = set(ids[moved < 0].dropna()) | set(frame['ID'].iloc[merge.added].dropna())
+        keep = (moved >= 0) & ~ids.isin(affected).to_numpy()
+        # Rows of the affected companies, and arrived rows without an ID
+        regrouped = np.union1d(np.flatnonzero(frame['ID'].isin(affected).to_numpy()),
+                               merge.added[frame['ID'].iloc[merge.added].isna().to_numpy()])
+        kept_count = int(keep.sum())
+        order, offsets = self._grouped(frame.iloc[regrouped].reset_index(drop=True), kept_count)
+
+        index = ZapierIndex.__new__(ZapierIndex)
+        index.version = version
+        index.frame = pd.concat([self.frame[keep], frame.iloc[regrouped[order]]], ignore_index=True)
+        index._rows = np.concatenate([moved[keep], regrouped[order]])
+        starts = np.concatenate(([0], np.cumsum(keep))).tolist()
+        index.offsets = {}
+        for company_id, (start, stop) in self.offsets.items():
+            if company_id not in affected:
+                index.offsets[company_id] = (starts[start], starts[start] + stop - start)
+        index.offsets.update(offsets)
+        index._columns()
+        return index
+
+    def _column(self, name):
+        if name in self.frame.columns:
+            return self.frame[name].to_numpy()
+        return np.full(len(self.frame), None, dtype=object)
+
+    def __contains__(self, company_id):
+        return company_id in self.offsets
+
+    def rows(self, company_id):
+        start, stop = self.offsets.get(company_id, (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def apis(self, company_id):
+        start, stop = self.offsets.get(company_id, (0, 0))
+        return list(zip(self._api_names[start:stop], self._api_types[start:stop]))
+
+    def api_names(self, company_id):
+        start, stop = self.offsets.get(company_id, (0, 0))
+        return self._api_names[start:stop].tolist()
+
+    def description(self, company_id):
+        start, stop = self.offsets.get(company_id, (0, 0))
+        return self._descriptions[start] if stop > start else None